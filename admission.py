@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import deque
+
+from metrics import ADMISSION, TURN_QUEUE_WAIT
+
+logger = logging.getLogger("debate.admission")
+
+# 모델별로 동시에 생성할 수 있는 턴 수 (넘으면 대기열로)
+MAX_ACTIVE_TURNS = int(os.environ.get("DEBATE_MAX_ACTIVE_TURNS", 8))
+# 모델별 대기열 길이 (가득 차면 새 턴은 busy 이벤트로, 새 토론은 503으로 돌려보낸다)
+MAX_QUEUED_TURNS = int(os.environ.get("DEBATE_MAX_QUEUED_TURNS", 16))
+# 대기열에서 기다리는 최대 시간 (초; 넘으면 busy로 돌려보낸다)
+MAX_QUEUE_WAIT = float(os.environ.get("DEBATE_MAX_QUEUE_WAIT", 60))
+# 턴 시간 측정값이 없을 때 쓰는 추정치 (초)
+INITIAL_TURN_SECONDS = 20.0
+# 턴 시간 이동 평균의 가중치
+TURN_SECONDS_ALPHA = 0.2
+RETRY_AFTER_MAX = 120
+# 이보다 많은 게이트가 생기면 쉬고 있는 게이트를 정리한다 (모델 이름은 요청에서 오므로)
+MAX_GATES = 64
+
+
+class AdmissionRejected(Exception):
+    """The model is at capacity; ``retry_after`` is the suggested wait in seconds."""
+
+    def __init__(self, model: str, retry_after: int):
+        super().__init__(f"{model} is at capacity, retry after {retry_after}s")
+        self.model = model
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """One turn's place at a ``ModelGate``: queued until ``admitted``, then holding a slot."""
+
+    __slots__ = ("gate", "admitted", "enqueued", "admitted_at", "released")
+
+    def __init__(self, gate):
+        self.gate = gate
+        self.admitted = False
+        self.enqueued = time.monotonic()
+        self.admitted_at = None
+        self.released = False
+
+    @property
+    def position(self) -> int:
+        """1-based place in the queue, 0 once admitted."""
+        return self.gate.position(self)
+
+    @property
+    def waited(self) -> float:
+        return time.monotonic() - self.enqueued
+
+    async def wait(self, timeout: float) -> bool:
+        """Wait up to ``timeout`` for admission or a change of position; True once admitted."""
+        if not self.admitted:
+            await asyncio.wait({self.gate.changed()}, timeout=timeout)
+        return self.admitted
+
+    def release(self):
+        self.gate.release(self)
+
+
+class ModelGate:
+    """Admission control for the turns of one (provider, model).
+
+    At most ``max_active`` turns generate at once; up to ``max_queued``
+    more wait in FIFO order and are admitted as slots free up. A turn that
+    finds the queue full is rejected right away with a Retry-After estimated
+    from the recent turn duration and the queue ahead of it, so a burst is
+    shed at the door instead of piling requests onto the Ollama host and
+    slowing down every debate. Limits are per server process.
+    """
+
+    def __init__(self, provider: str, model: str, max_active: int = MAX_ACTIVE_TURNS,
+                 max_queued: int = MAX_QUEUED_TURNS):
+        self.provider = provider
+        self.model = model
+        self.max_active = max_active
+        self.max_queued = max_queued
+        self.active = 0
+        self._queue = deque()
+        self._turn_seconds = INITIAL_TURN_SECONDS
+        # 대기열이 바뀔 때마다 완료되는 future (대기 중인 턴이 순번을 다시 보낸다)
+        self._changed = None
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def has_capacity(self) -> bool:
+        return self.active < self.max_active or len(self._queue) < self.max_queued
+
+    def retry_after(self) -> int:
+        # 앞선 대기열이 빠지는 데 걸릴 시간: 한 바퀴(max_active개 턴)마다 평균 턴 시간
+        rounds = (len(self._queue) + 1) / self.max_active
+        return max(1, min(RETRY_AFTER_MAX, math.ceil(self._turn_seconds * rounds)))
+
+    def enter(self) -> Ticket:
+        """Admit a turn or queue it; raises ``AdmissionRejected`` when the queue is full."""
+        if not self.has_capacity():
+            ADMISSION.inc(self.provider, self.model, "rejected")
+            raise AdmissionRejected(self.model, self.retry_after())
+        ticket = Ticket(self)
+        if self.active < self.max_active and not self._queue:
+            self._admit(ticket)
+        else:
+            self._queue.append(ticket)
+            ADMISSION.inc(self.provider, self.model, "queued")
+            self._notify()
+        return ticket
+
+    def position(self, ticket: Ticket) -> int:
+        if ticket.admitted:
+            return 0
+        try:
+            return self._queue.index(ticket) + 1
+        except ValueError:
+            return 0
+
+    def release(self, ticket: Ticket):
+        if ticket.released:
+            return
+        ticket.released = True
+        if ticket.admitted:
+            self.active -= 1
+            duration = time.monotonic() - ticket.admitted_at
+            self._turn_seconds += TURN_SECONDS_ALPHA * (duration - self._turn_seconds)
+        else:
+            # 대기 중에 끊겼거나 너무 오래 기다린 턴
+            self._queue.remove(ticket)
+        self._dispatch()
+
+    def changed(self) -> asyncio.Future:
+        if self._changed is None or self._changed.done():
+            self._changed = asyncio.get_running_loop().create_future()
+        return self._changed
+
+    def _admit(self, ticket: Ticket):
+        ticket.admitted = True
+        ticket.admitted_at = time.monotonic()
+        self.active += 1
+        ADMISSION.inc(self.provider, self.model, "admitted")
+        TURN_QUEUE_WAIT.observe(ticket.admitted_at - ticket.enqueued, self.provider, self.model)
+
+    def _dispatch(self):
+        while self._queue and self.active < self.max_active:
+            self._admit(self._queue.popleft())
+        self._notify()
+
+    def _notify(self):
+        if self._changed is not None and not self._changed.done():
+            self._changed.set_result(None)
+
+
+class AdmissionController:
+    def __init__(self, max_active: int = MAX_ACTIVE_TURNS, max_queued: int = MAX_QUEUED_TURNS):
+        self.max_active = max_active
+        self.max_queued = max_queued
+        self._gates = {}
+
+    def gate(self, provider: str, model: str) -> ModelGate:
+        gate = self._gates.get((provider, model))
+        if gate is None:
+            if len(self._gates) >= MAX_GATES:
+                self._prune()
+            gate = ModelGate(provider, model, self.max_active, self.max_queued)
+            self._gates[(provider, model)] = gate
+        return gate
+
+    def _prune(self):
+        # 실행 중이거나 대기 중인 턴이 없는 게이트는 지워도 된다 (턴 시간 추정치만 잃는다)
+        self._gates = {key: gate for key, gate in self._gates.items() if gate.active or gate.queue_depth}
+
+    def check_capacity(self, provider: str, model: str):
+        """Reject a new debate early when its model can't take another turn."""
+        # 게이트가 없으면 그 모델로 진행 중인 턴도 없다
+        gate = self._gates.get((provider, model))
+        if gate is not None and not gate.has_capacity():
+            ADMISSION.inc(provider, model, "rejected")
+            raise AdmissionRejected(model, gate.retry_after())
+
+
+_controller = AdmissionController()
+
+
+def get_admission_controller() -> AdmissionController:
+    return _controller
@@ -0,0 +1,195 @@
+"""Headless batch debates.
+
+Runs many debates concurrently on the shared debate graph and streams every
+finished turn to a JSONL file.
+
+Input is a JSONL file, one debate per line::
+
+    {"topic": "비트코인은 최고의 자산이다", "model": "qwq", "provider": "ollama",
+     "proponent_model": "gemma3:27b", "opponent_model": "qwq"}
+
+Only ``topic`` is required; plain text lines are read as topics too.
+
+    python batch.py topics.jsonl -o transcripts.jsonl --concurrency 8 --processes 2
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from debate_graph import get_shared_debate_app, session_config
+from event_dispatch import NODE_ROLES
+from logging_setup import configure_logging
+from ollama_pool import get_ollama_pool
+
+logger = logging.getLogger("debate.batch")
+
+
+def load_jobs(path, default_model, default_provider, pipelined=None, moderator_gate=None):
+    jobs = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            job = json.loads(line) if line.startswith("{") else {"topic": line}
+            job.setdefault("model", default_model)
+            job.setdefault("provider", default_provider)
+            job.setdefault("pipelined", pipelined)
+            job.setdefault("moderator_gate", moderator_gate)
+            job.setdefault("debate_id", str(uuid.uuid4()))
+            jobs.append(job)
+    return jobs
+
+
+def node_models_for(job):
+    node_models = {}
+    for node, key in (("moderator", "moderator_model"), ("debater_A", "proponent_model"),
+                      ("debater_B", "opponent_model")):
+        if job.get(key):
+            node_models[node] = {"model": job[key], "provider": job.get(key.replace("model", "provider"))}
+    return node_models
+
+
+class JsonlWriter:
+    def __init__(self, path):
+        # O_APPEND + one write() per record, so several worker processes can share the file
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+
+    def write(self, record: dict):
+        os.write(self._fd, (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+
+    def close(self):
+        os.close(self._fd)
+
+
+async def run_debate(job, writer, max_turns):
+    debate_app = get_shared_debate_app()
+    debate_id = job["debate_id"]
+    config = session_config(debate_id, job["model"], job["provider"], job.get("api_key"),
+                            priority="batch", node_models=node_models_for(job),
+                            pipelined=job.get("pipelined"), moderator_gate=job.get("moderator_gate"))
+
+    started = time.perf_counter()
+    inputs = {"history": [], "current_topic": job["topic"]}
+    turn = 0
+    decision = None
+    try:
+        while turn < max_turns:
+            turn_started = time.perf_counter()
+            updates = {}
+            # One graph step per call: the graph interrupts after every node
+            async for chunk in debate_app.astream(inputs, config=config, stream_mode="updates"):
+                for node, update in chunk.items():
+                    if node in NODE_ROLES and update:
+                        updates[node] = update
+            inputs = None
+            if not updates:
+                break
+
+            for node, update in updates.items():
+                decision = update.get("decision", decision)
+                writer.write({
+                    "debate_id": debate_id,
+                    "topic": job["topic"],
+                    "turn": turn,
+                    "node": node,
+                    "role": NODE_ROLES[node],
+                    "text": update["history"][-1].text if update.get("history") else "",
+                    "decision": update.get("decision"),
+                    "duration_s": round(time.perf_counter() - turn_started, 3),
+                    "metrics": update.get("turn_stats")
+                })
+            turn += 1
+
+            snapshot = await debate_app.aget_state(config)
+            if not snapshot.next:
+                break
+
+        writer.write({
+            "debate_id": debate_id,
+            "topic": job["topic"],
+            "type": "debate_end",
+            "turns": turn,
+            "decision": decision,
+            "duration_s": round(time.perf_counter() - started, 3)
+        })
+    finally:
+        # 프로세스가 체크포인터 하나를 공유하므로 끝난 토론의 체크포인트는 바로 지운다
+        debate_app.checkpointer.delete_thread(debate_id)
+    logger.info("Debate %s finished: %d turns in %.1fs", debate_id, turn, time.perf_counter() - started)
+
+
+async def run_batch(jobs, output, concurrency, max_turns):
+    writer = JsonlWriter(output)
+    ollama_pool = get_ollama_pool()
+    await ollama_pool.check_all()
+    ollama_pool.start()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_one(job):
+        async with semaphore:
+            try:
+                await run_debate(job, writer, max_turns)
+            except Exception as e:
+                logger.exception("Debate %s failed", job["debate_id"])
+                writer.write({"debate_id": job["debate_id"], "topic": job["topic"], "type": "error", "error": str(e)})
+
+    try:
+        await asyncio.gather(*(run_one(job) for job in jobs))
+    finally:
+        writer.close()
+        await ollama_pool.aclose()
+
+
+def _run_shard(jobs, output, concurrency, max_turns):
+    configure_logging()
+    asyncio.run(run_batch(jobs, output, concurrency, max_turns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run debates headlessly and write transcripts as JSONL.")
+    parser.add_argument("input", nargs="?", help="JSONL file of debates (or one topic per line)")
+    parser.add_argument("-o", "--output", default="transcripts.jsonl")
+    parser.add_argument("--model", default="qwq")
+    parser.add_argument("--provider", default="ollama", choices=["ollama", "google"])
+    parser.add_argument("--concurrency", type=int, default=4, help="debates in flight per process")
+    parser.add_argument("--processes", type=int, default=1, help="worker processes to fan the debates across")
+    parser.add_argument("--max-turns", type=int, default=100)
+    parser.add_argument("--pipelined", action="store_true", default=None,
+                        help="overlap each node with speculative work for the next one")
+    parser.add_argument("--moderator-gate", choices=["off", "local"],
+                        help="skip the LLM moderator on routine turns (default: DEBATE_MODERATOR_GATE)")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="report the import time of a batch worker and each provider, then exit")
+    args = parser.parse_args()
+
+    if args.profile_startup:
+        from startup_profile import profile_startup
+        sys.exit(0 if profile_startup("batch") else 1)
+    if args.input is None:
+        parser.error("the following arguments are required: input")
+
+    configure_logging()
+    jobs = load_jobs(args.input, args.model, args.provider, args.pipelined, args.moderator_gate)
+    logger.info("Running %d debates (%d processes x %d concurrent)", len(jobs), args.processes, args.concurrency)
+
+    if args.processes <= 1:
+        asyncio.run(run_batch(jobs, args.output, args.concurrency, args.max_turns))
+        return
+
+    shards = [jobs[i::args.processes] for i in range(args.processes)]
+    with ProcessPoolExecutor(args.processes) as pool:
+        futures = [pool.submit(_run_shard, shard, args.output, args.concurrency, args.max_turns)
+                   for shard in shards if shard]
+        for future in futures:
+            future.result()
+
+
+if __name__ == "__main__":
+    main()
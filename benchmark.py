@@ -0,0 +1,245 @@
+"""Throughput benchmark for server.py against the local mock LLM (mock_llm.py).
+
+Starts the mock Ollama and the debate server as subprocesses, drives
+/start_debate + /next_turn with many concurrent simulated clients and
+reports turn latency, time to first frame, SSE frame rate, server CPU per
+token and server memory per session. No Ollama or Gemini needed. Requests
+the server sheds (503 / "busy") are retried after the suggested delay and
+counted separately; latency covers admitted turns only.
+
+    python benchmark.py --clients 20 --turns 6 --tokens-per-sec 200
+    python benchmark.py --clients 50 --error-rate 0.05 --json bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def proc_cpu_seconds(pid):
+    """utime + stime of a process (Linux /proc only; None elsewhere)."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def proc_rss_bytes(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+async def wait_until_up(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(url, timeout=1)).status_code < 500:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+async def run_client(client, base_url, args, results):
+    while True:
+        response = await client.post(f"{base_url}/start_debate", json={
+            "topic": "벤치마크 토론 주제",
+            "model": args.model,
+            "provider": "ollama",
+            "flush_interval_ms": args.flush_interval_ms,
+            "pipelined": args.pipelined,
+            "moderator_gate": args.moderator_gate
+        })
+        if response.status_code != 503:
+            break
+        # 서버가 새 토론을 받을 여유가 없다: 알려 준 시간만큼 기다렸다가 다시 시도
+        results["shed"] += 1
+        await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+    if response.status_code != 200:
+        results["errors"] += 1
+        return
+    session_id = response.json()["session_id"]
+
+    turns = 0
+    while turns < args.turns:
+        started = time.perf_counter()
+        first_frame = None
+        frames = 0
+        ended = False
+        retry_after = None
+        queued = False
+        async with client.stream("GET", f"{base_url}/next_turn", params={"session_id": session_id}) as stream:
+            if stream.status_code != 200:
+                results["errors"] += 1
+                return
+            async for line in stream.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                event = json.loads(line[6:])
+                frames += 1
+                if event["type"] == "token" and first_frame is None:
+                    first_frame = time.perf_counter() - started
+                elif event["type"] == "waiting" and event["position"] > 0:
+                    queued = True
+                elif event["type"] == "busy":
+                    retry_after = event["retry_after"]
+                elif event["type"] == "error":
+                    results["errors"] += 1
+                elif event["type"] == "end":
+                    ended = True
+        results["frames"] += frames
+        if retry_after is not None:
+            # 턴이 시작되지 않았다: 지연 시간에 넣지 않고 같은 턴을 다시 요청한다
+            results["shed"] += 1
+            await asyncio.sleep(retry_after)
+            continue
+        turns += 1
+        results["queued"] += queued
+        results["turn_latency"].append(time.perf_counter() - started)
+        if first_frame is not None:
+            results["first_frame"].append(first_frame)
+        if ended:
+            return
+
+
+async def run_load(args, base_url):
+    results = {"turn_latency": [], "first_frame": [], "frames": 0, "errors": 0, "shed": 0, "queued": 0}
+    limits = httpx.Limits(max_connections=args.clients * 2)
+    async with httpx.AsyncClient(timeout=None, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(run_client(client, base_url, args, results) for _ in range(args.clients)))
+        results["wall_seconds"] = time.perf_counter() - started
+    return results
+
+
+def start_process(cmd, env=None):
+    return subprocess.Popen(cmd, cwd=HERE, env={**os.environ, **(env or {})})
+
+
+def stop_process(process):
+    process.send_signal(signal.SIGINT)
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+async def main_async(args):
+    mock_url = f"http://127.0.0.1:{args.mock_port}"
+    base_url = f"http://127.0.0.1:{args.server_port}"
+
+    mock = start_process([
+        sys.executable, "mock_llm.py", "--port", str(args.mock_port),
+        "--tokens-per-sec", str(args.tokens_per_sec), "--chunk-size", str(args.chunk_size),
+        "--latency", str(args.latency), "--reply-tokens", str(args.reply_tokens),
+        "--error-rate", str(args.error_rate), "--models", args.model
+    ])
+    server = None
+    try:
+        await wait_until_up(f"{mock_url}/api/tags")
+        server = start_process(
+            [sys.executable, "-m", "uvicorn", "server:app", "--port", str(args.server_port), "--log-level", "warning"],
+            env={"OLLAMA_BASE_URL": mock_url, "DEBATE_LOG_LEVEL": "WARNING"}
+        )
+        await wait_until_up(f"{base_url}/models")
+
+        cpu_before = proc_cpu_seconds(server.pid)
+        rss_before = proc_rss_bytes(server.pid)
+        results = await run_load(args, base_url)
+        cpu_after = proc_cpu_seconds(server.pid)
+        rss_after = proc_rss_bytes(server.pid)
+
+        async with httpx.AsyncClient() as client:
+            mock_stats = (await client.get(f"{mock_url}/mock/stats")).json()
+    finally:
+        if server is not None:
+            stop_process(server)
+        stop_process(mock)
+
+    tokens = mock_stats["tokens"]
+    report = {
+        "clients": args.clients,
+        "turns": len(results["turn_latency"]),
+        "errors": results["errors"],
+        "shed_requests": results["shed"],
+        "queued_turns": results["queued"],
+        "llm_requests": mock_stats["requests"],
+        "llm_rejected_429": mock_stats["rejected"],
+        "tokens": tokens,
+        "wall_seconds": round(results["wall_seconds"], 2),
+        "turn_latency_p50": percentile(results["turn_latency"], 50),
+        "turn_latency_p99": percentile(results["turn_latency"], 99),
+        "first_frame_p50": percentile(results["first_frame"], 50),
+        "first_frame_p99": percentile(results["first_frame"], 99),
+        "sse_frames": results["frames"],
+        "sse_frames_per_sec": round(results["frames"] / results["wall_seconds"], 1),
+        "server_cpu_seconds": None,
+        "server_cpu_ms_per_token": None,
+        "server_rss_mb_per_session": None
+    }
+    if cpu_before is not None and cpu_after is not None:
+        report["server_cpu_seconds"] = round(cpu_after - cpu_before, 3)
+        if tokens:
+            report["server_cpu_ms_per_token"] = round((cpu_after - cpu_before) * 1000 / tokens, 4)
+    if rss_before is not None and rss_after is not None:
+        report["server_rss_mb_per_session"] = round((rss_after - rss_before) / args.clients / 2**20, 3)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the debate server against a mock LLM.")
+    parser.add_argument("--clients", type=int, default=20, help="concurrent simulated browsers")
+    parser.add_argument("--turns", type=int, default=6, help="turns per client")
+    parser.add_argument("--model", default="mock:latest")
+    parser.add_argument("--tokens-per-sec", type=float, default=200.0)
+    parser.add_argument("--chunk-size", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--reply-tokens", type=int, default=120)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of LLM requests answered with 429")
+    parser.add_argument("--flush-interval-ms", type=int, default=30)
+    parser.add_argument("--pipelined", action="store_true", help="start sessions in pipelined mode")
+    parser.add_argument("--moderator-gate", default="off", choices=["off", "local"],
+                        help="skip the LLM moderator on routine turns")
+    parser.add_argument("--mock-port", type=int, default=11435)
+    parser.add_argument("--server-port", type=int, default=8765)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(main_async(args))
+    for key, value in report.items():
+        if isinstance(value, float):
+            value = round(value, 4)
+        print(f"{key:28} {value}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+
+from langchain_core.messages import AIMessage, SystemMessage
+
+from history import estimate_tokens
+from utils import match_model, spawn_detached
+
+logger = logging.getLogger("debate.context_cache")
+
+# Gemini 명시적 컨텍스트 캐시 사용 여부 (기본은 꺼짐; 캐시 저장 시간만큼 과금된다)
+GEMINI_CONTEXT_CACHE = os.environ.get("GEMINI_CONTEXT_CACHE", "0") == "1"
+CACHE_TTL_SECONDS = int(os.environ.get("GEMINI_CACHE_TTL", 600))
+# 캐시되지 않은 발언이 이만큼 쌓이면 더 긴 앞부분으로 캐시를 새로 만든다
+REFRESH_EVERY = 6
+MAX_ENTRIES = 256
+
+# 모델별 최소 캐시 크기 (모델 이름 prefix 매칭, 가장 긴 prefix 우선)
+DEFAULT_MIN_TOKENS = 4096
+MODEL_MIN_TOKENS = {
+    "gemini-2.5-flash": 1024,
+    "gemini-2.0-flash": 1024,
+    "gemini-2.5-pro": 4096,
+}
+
+
+def get_min_tokens(model_name: str) -> int:
+    return match_model(MODEL_MIN_TOKENS, model_name, DEFAULT_MIN_TOKENS)
+
+
+def _fingerprint(messages) -> str:
+    digest = hashlib.sha1()
+    for message in messages:
+        digest.update(message.type.encode())
+        digest.update(b"\0")
+        digest.update(message.content.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class CacheEntry:
+    __slots__ = ("name", "count", "fingerprint", "expires_at", "api_key")
+
+    def __init__(self, name, count, fingerprint, expires_at, api_key):
+        self.name = name
+        # 캐시에 들어간 앞쪽 메시지 수 (시스템 메시지 포함)
+        self.count = count
+        self.fingerprint = fingerprint
+        self.expires_at = expires_at
+        self.api_key = api_key
+
+
+class GeminiContextCache:
+    """Explicit Gemini context caches for the shared prefix of debate prompts.
+
+    ``apply`` is called with a prompt (see ``prompts.build_messages``) and
+    never waits on the API: if a cache covering the start of the prompt
+    exists, the cached messages are cut off and the cache name is returned
+    to send along. Creating or extending a cache happens in the background
+    and is picked up by the next call.
+    """
+
+    def __init__(self, ttl: int = CACHE_TTL_SECONDS, refresh_every: int = REFRESH_EVERY,
+                 max_entries: int = MAX_ENTRIES):
+        self.ttl = ttl
+        self.refresh_every = refresh_every
+        self.max_entries = max_entries
+        # (thread_id, model) -> CacheEntry, least recently used first
+        self._entries = OrderedDict()
+        # (thread_id, model) -> creation task
+        self._pending = {}
+
+    def apply(self, thread_id, model: str, api_key, messages):
+        """Return (messages to send, cached_content name or None)."""
+        key = (thread_id, model)
+        prefix = messages[:-1]
+        entry = self._entries.get(key)
+        if entry is not None and not self._covers(entry, prefix):
+            self._drop(key)
+            entry = None
+
+        cached = 0 if entry is None else entry.count
+        if len(prefix) - cached >= (1 if entry is None else self.refresh_every):
+            self._refresh(key, api_key, prefix)
+
+        if entry is None:
+            return messages, None
+        self._entries.move_to_end(key)
+        return messages[entry.count:], entry.name
+
+    def invalidate(self, thread_id, model: str):
+        self._drop((thread_id, model))
+
+    def _covers(self, entry, prefix) -> bool:
+        if time.monotonic() >= entry.expires_at - 30:
+            return False
+        return entry.count <= len(prefix) and _fingerprint(prefix[:entry.count]) == entry.fingerprint
+
+    def _refresh(self, key, api_key, prefix):
+        if key in self._pending:
+            return
+        # Gemini는 일정 크기 이하의 캐시를 만들지 않는다
+        if estimate_tokens("".join(message.content for message in prefix)) < get_min_tokens(key[1]):
+            return
+        task = spawn_detached(self._create(key, api_key, list(prefix)))
+        self._pending[key] = task
+        task.add_done_callback(lambda t: self._pending.pop(key, None))
+
+    async def _create(self, key, api_key, prefix):
+        from google import genai
+        from google.genai import types
+
+        system = [m.content for m in prefix if isinstance(m, SystemMessage)]
+        contents = [
+            types.Content(role="model" if isinstance(m, AIMessage) else "user", parts=[types.Part(text=m.content)])
+            for m in prefix if not isinstance(m, SystemMessage)
+        ]
+        client = genai.Client(api_key=api_key) if api_key else genai.Client()
+        try:
+            cache = await client.aio.caches.create(
+                model=key[1],
+                config=types.CreateCachedContentConfig(
+                    system_instruction="\n".join(system) or None,
+                    contents=contents,
+                    ttl=f"{self.ttl}s"
+                )
+            )
+        except Exception as e:
+            logger.warning("Could not create Gemini context cache for %s: %r", key[1], e)
+            return
+
+        self._drop(key)
+        self._entries[key] = CacheEntry(cache.name, len(prefix), _fingerprint(prefix),
+                                        time.monotonic() + self.ttl, api_key)
+        logger.debug("Cached %d messages for %s as %s", len(prefix), key, cache.name)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        spawn_detached(self._delete(entry))
+
+    async def _delete(self, entry):
+        from google import genai
+
+        client = genai.Client(api_key=entry.api_key) if entry.api_key else genai.Client()
+        try:
+            await client.aio.caches.delete(name=entry.name)
+        except Exception as e:
+            logger.debug("Could not delete Gemini context cache %s: %r", entry.name, e)
+
+
+_cache = None
+
+
+def get_context_cache() -> GeminiContextCache:
+    global _cache
+    if _cache is None:
+        _cache = GeminiContextCache()
+    return _cache
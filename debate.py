@@ -1,5 +1,6 @@
 # from langchain.chat_models import ChatOpenAI
 from langchain_ollama import ChatOllama
+from ollama_pool import OLLAMA_HOSTS
 
 from langchain.prompts.chat import (
     ChatPromptTemplate,
@@ -91,7 +92,7 @@ def run_debate(topic, agent1_role, agent2_role, num_rounds=3, openai_api_key="YO
     # LLM 설정 (OpenAI API Key 필요)
     # llm = ChatOpenAI(temperature=0.7, openai_api_key=openai_api_key)
     # llm = ChatOllama(base_url='http://192.168.0.2:11434', model='qwq')
-    llm = ChatOllama(base_url='http://192.168.0.2:11434', model='gemma3:27b-it-q4_K_M')
+    llm = ChatOllama(base_url=OLLAMA_HOSTS[0], model='gemma3:27b-it-q4_K_M')
 
     # 토론 에이전트 및 사회자 생성
     agent1 = DebateAgent(name="철수", role=agent1_role, llm=llm, topic=topic)
@@ -1,199 +1,388 @@
+import asyncio
+import logging
+import operator
+import time
 from langgraph.graph import END, StateGraph
-from typing import Dict, TypedDict, List
-from langchain_ollama import ChatOllama
-from langchain_google_genai import ChatGoogleGenerativeAI
-import os
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
-from google.api_core.exceptions import ResourceExhausted
+from typing import Annotated, Dict, TypedDict, List
+from tenacity import retry, stop_after_attempt, retry_if_exception
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.memory import MemorySaver
+from history import HistoryEngine, SUMMARY_PROMPT, DEFAULT_WINDOW, get_token_budget, estimate_tokens
+from llm_registry import get_llm, is_rate_limited, PROVIDER_TEMPERATURE
+from llm_scheduler import get_scheduler, PRIORITIES, PRIORITY_BACKGROUND
+from metrics import CallStats, RESPONSE_CACHE, MODERATOR_GATE
+from ollama_pool import get_ollama_pool, CONNECTION_ERRORS
+from pipeline import Pipeline, NEXT_NODE, DEFAULT_PIPELINED
+from moderator_gate import create_gate, DEFAULT_MODERATOR_GATE, ROUTINE
+from prompts import (build_messages, prompt_text, MODERATOR_OPENING, MODERATOR_TURN, MODERATOR_CONTINUE, DEBATER_TURN,
+                     PRECHECK_TURN, PRECHECK_OK)
+from context_cache import get_context_cache, GEMINI_CONTEXT_CACHE
+from stream_parser import ResponseParser
+from utterances import Utterance, SPEAKER_NAMES, merge_offsets, last_by, checkpoint_serde
+from response_cache import get_response_cache, ReplayChatModel
+
+logger = logging.getLogger("debate.graph")
 
 # 상태 정의
 class DebateState(TypedDict):
-    history: List[str]
+    # 노드는 새 발언만 반환하고 reducer가 이어 붙인다
+    history: Annotated[List[Utterance], operator.add]
+    # 역할(노드) -> 그 역할의 마지막 발언 위치 (history 인덱스)
+    last_index: Annotated[Dict[str, int], merge_offsets]
     current_topic: str
     decision: str # Added decision to state for easier access
+    turn_stats: dict # 마지막 노드의 지연 시간/처리량 (turn_end 이벤트로 전달)
+    summary: str # 윈도우 밖으로 밀려난 발언들의 누적 요약
+    summarized_upto: int # summary에 반영된 history 개수
+    gate_skips: int # 로컬 게이트가 연속으로 LLM 사회자를 건너뛴 횟수
 
 MAX_TURNS = 100
 
-# 사회자 프롬프트 템플릿
-MODERATOR_INIT_PROMPT = """당신은 전문 토론 사회자입니다. 
-주제: {topic}
-
-다음 규칙을 엄격히 지키세요:
-1. 양측의 입장을 명확히 하고, 토론의 쟁점을 제시하세요.
-2. 토론이 활발하게 이루어질 수 있도록 흥미로운 소주제를 던지세요.
-3. 첫 발언이므로 토론자들에게 발언 기회를 넘기세요.
-4. 절대 토론을 바로 종료하지 마세요.
-
-출력 형식:
-[사회자 발언 내용]
-Decision: continue
-"""
-
-MODERATOR_PROMPT = """당신은 전문 토론 사회자입니다. 
-주제: {topic}
-
-다음 규칙을 엄격히 지키세요:
-1. 주제에서 벗어난 발언이 있으면 즉시 중단하고 주제로 돌아가도록 지시하세요.
-2. 동일한 주장의 반복이 너무 많이 발생하면 새로운 관점을 제시하거나 다음 쟁점으로 넘어가세요.
-3. 건전한 토론 환경을 유지하기 위해 공격적인 발언 시 경고하세요.
-4. 토론이 원활히 진행되지 않는다면 주제에서의 소주제를 제시하여 토론을 이어가도록 유도하세요.
-5. 토론이 충분히 무르익었거나(최소 10회 이상 왕복), 더 이상 새로운 논점이 나오지 않을 때만 종료를 선언하세요.
-6. 그 전까지는 토론을 계속 진행시키세요.
-
-지난 발언 기록:
-{history}
-
-다음 발언 전에 다음 중 하나의 판단을 내려야 합니다. 반드시 마지막 줄에 Decision: [continue/instruction/stop] 형식을 포함하세요.
-- 계속 진행 (특별한 개입 필요 없음): 'continue'
-- 의사 진행 발언 (개입 필요): 'instruction'
-- 토론 종료: 'stop'
-
-출력 예시:
-[사회자 발언 또는 평가 내용]
-Decision: continue
-"""
-
-# 토론자 프롬프트 템플릿
-DEBATER_PROMPT = """당신은 {name} 입장의 토론자입니다. 
-주제: {topic}
-
-다음 지침을 따라 토론에 참여하세요:
-1. 상대방의 논리를 날카롭게 분석하고 반박하세요.
-2. 자신의 주장을 뒷받침할 구체적인 근거와 예시를 제시하세요.
-3. 상대방의 의견 중 타당한 부분은 인정하되, 핵심 쟁점에서는 물러서지 마세요.
-4. 감정적인 대응보다는 논리적인 설득을 우선시하세요.
-5. 사회자의 지시가 있다면 이를 충실히 따르세요.
-6. 상대방을 존중하는 태도를 유지하세요.
-
-지난 발언 기록:
-{recent_history}
-
-사회자의 지시사항:
-{moderator_instruction}
-
-당신의 차례입니다. 간결하고 강력하게 발언하세요:"""
-
-def get_last_instructions(history):
-    for msg in reversed(history):
-        if "사회자:" in msg:
-            content = msg.split("사회자:")[1].strip()
-            # Remove Decision line if present in history
-            if "Decision:" in content:
-                content = content.split("Decision:")[0].strip()
-            return content
-    return ""
-
-def create_debate_app(model_name: str, provider: str, api_key: str = None):
-    
-    if provider == 'google':
-        if not api_key and "GOOGLE_API_KEY" not in os.environ:
-            print("Warning: GOOGLE_API_KEY not found.")
-        
-        llm = ChatGoogleGenerativeAI(model=model_name, temperature=0.7, google_api_key=api_key)
-    else:
-        # Default to Ollama
-        llm = ChatOllama(base_url='http://192.168.0.2:11434', model=model_name)
+def get_last_instructions(state):
+    # 사회자 발언은 Decision 줄이 이미 분리된 채로 저장된다
+    utterance = last_by(state, "moderator")
+    return utterance.text if utterance is not None else ""
+
+def speak(state, role: str, text: str) -> dict:
+    """State update that appends one utterance by ``role``."""
+    return {"history": [Utterance.create(role, text)], "last_index": {role: len(state["history"])}}
+
+def session_config(thread_id: str, model_name: str, provider: str, api_key: str = None,
+                   priority: str = "interactive", node_models: dict = None, pipelined: bool = None,
+                   moderator_gate: str = None):
+    """Per-session config for the shared graph: the thread plus which LLM to use.
+
+    ``priority`` ("interactive" or "batch") orders this session's LLM calls
+    in the shared scheduler. ``node_models`` optionally overrides the model
+    per node, e.g. ``{"debater_B": {"provider": "google", "model": "gemini-2.5-flash"}}``.
+    ``pipelined`` overlaps each node with speculative work for the next one
+    (see ``pipeline.Pipeline``); it pays off when the provider serves
+    parallel requests.
+    """
+    return {
+        "configurable": {
+            "thread_id": thread_id,
+            "model": model_name,
+            "provider": provider,
+            "api_key": api_key,
+            "priority": priority,
+            "node_models": node_models or {},
+            "pipelined": DEFAULT_PIPELINED if pipelined is None else pipelined,
+            "moderator_gate": moderator_gate or DEFAULT_MODERATOR_GATE
+        },
+        "recursion_limit": 150
+    }
+
+def build_debate_graph(model_name: str = None, provider: str = "ollama", api_key: str = None,
+                       history_window: int = DEFAULT_WINDOW, token_budget: int = None,
+                       checkpointer=None):
+    """Compile the debate graph.
+
+    The LLM is resolved per call from ``config["configurable"]`` (see
+    ``session_config``), so one compiled graph can serve every session.
+    The arguments here are only defaults for configs that don't set them.
+    """
+
+    def resolve_model(config, node=None):
+        configurable = config.get("configurable", {})
+        node = node or config.get("metadata", {}).get("langgraph_node")
+        override = configurable.get("node_models", {}).get(node)
+        if override:
+            return (
+                override.get("provider") or configurable.get("provider") or provider,
+                override.get("model") or configurable.get("model") or model_name,
+                override.get("api_key") or configurable.get("api_key") or api_key
+            )
+        return (
+            configurable.get("provider") or provider,
+            configurable.get("model") or model_name,
+            configurable.get("api_key") or api_key
+        )
+
+    scheduler = get_scheduler()
+    ollama_pool = get_ollama_pool()
+    context_cache = get_context_cache()
+    response_cache = get_response_cache()
+
+    async def read_completion(llm, prompt, stats, started, parse_decision, kwargs):
+        response = ResponseParser(parse_decision)
+        chunks = 0
+        usage = None
+        async for chunk in llm.astream(prompt, **kwargs):
+            if chunk.content:
+                if stats.ttft is None:
+                    stats.ttft = time.perf_counter() - started
+                chunks += 1
+                response.feed(chunk.content)
+            usage = getattr(chunk, "usage_metadata", None) or usage
+        response.close()
+        return response, chunks, usage
+
+    async def stream_completion(llm, prompt, stats, started, parse_decision=False, **kwargs):
+        # 응답은 별도 태스크에서 읽는다. astream_events는 소비자가 취소되면 그래프 태스크를 두 번
+        # 취소하는데, 두 번째 취소가 HTTP 연결을 닫는 정리 코드를 끊으면 연결이 열린 채 남아
+        # 서버(Ollama)가 끝까지 생성을 계속한다. 읽기 태스크는 한 번만 취소되므로 연결이 확실히 닫힌다.
+        reader = asyncio.ensure_future(read_completion(llm, prompt, stats, started, parse_decision, kwargs))
+        try:
+            return await asyncio.shield(reader)
+        except asyncio.CancelledError:
+            reader.cancel()
+            reader.add_done_callback(lambda t: t.cancelled() or t.exception())
+            raise
+
+    async def stream_ollama(model, prompt, stats, started, **kwargs):
+        # 연결 실패 시 아직 토큰이 나가지 않았다면 다른 호스트로 넘긴다
+        tried = set()
+        while True:
+            async with ollama_pool.lease(model, exclude=tried) as endpoint:
+                llm = get_llm("ollama", model, None, endpoint.url)
+                try:
+                    return await stream_completion(llm, prompt, stats, started, **kwargs)
+                except CONNECTION_ERRORS as e:
+                    ollama_pool.mark_failed(endpoint, e)
+                    tried.add(endpoint.url)
+                    if stats.ttft is not None or len(tried) == len(ollama_pool.endpoints):
+                        raise
+                    logger.warning("Retrying %s on another Ollama host", model)
+
+    async def stream_gemini(model, key, prompt, stats, started, thread_id, **kwargs):
+        llm = get_llm("google", model, key)
+        if not GEMINI_CONTEXT_CACHE or isinstance(prompt, str):
+            return await stream_completion(llm, prompt, stats, started, **kwargs)
+        # 공통 앞부분이 캐시되어 있으면 나머지 메시지만 보낸다
+        messages, cached_content = context_cache.apply(thread_id, model, key, prompt)
+        if cached_content is None:
+            return await stream_completion(llm, prompt, stats, started, **kwargs)
+        try:
+            return await stream_completion(llm, messages, stats, started, cached_content=cached_content, **kwargs)
+        except Exception as e:
+            # 캐시가 만료/삭제되었을 수 있으니 토큰이 나가기 전이면 캐시 없이 다시 보낸다
+            if is_rate_limited(e) or stats.ttft is not None:
+                raise
+            logger.warning("Gemini request with context cache failed, retrying without it: %r", e)
+            context_cache.invalidate(thread_id, model)
+            return await stream_completion(llm, prompt, stats, started, **kwargs)
+
+    async def invoke_llm(prompt, config, priority=None, stats=None, node=None, **kwargs):
+        """Stream one completion through the scheduler; returns the parsed ``ResponseParser``."""
+        if stats is None:
+            stats = new_stats(config)
+        return await attempt_llm(prompt, config, priority, stats, node, **kwargs)
 
     # Retry configuration
-    # Wait exponentially: 4s, 8s, 16s... up to 60s. Stop after 5 attempts.
-    # Retry specifically on ResourceExhausted (429)
+    # Retry specifically on rate limits (429). The backoff itself is shared:
+    # the 429 leaves the scheduler slot, which pauses the whole provider
+    # (4s, 8s, 16s... up to 60s), and the retry waits for its turn in the queue again.
     @retry(
-        retry=retry_if_exception_type(ResourceExhausted),
-        wait=wait_exponential(multiplier=1, min=4, max=60),
-        stop=stop_after_attempt(10)
+        retry=retry_if_exception(is_rate_limited),
+        stop=stop_after_attempt(10),
+        reraise=True
     )
-    async def invoke_llm(prompt):
-        content = ""
-        async for chunk in llm.astream(prompt):
-            content += chunk.content
-        return content
-
-    async def moderator_node(state: DebateState):
-        history_str = "\n".join(state["history"])
+    async def attempt_llm(prompt, config, priority, stats, node, **kwargs):
+        provider_name, model, key = resolve_model(config, node)
+        configurable = config.get("configurable", {})
+        if priority is None:
+            priority = PRIORITIES.get(configurable.get("priority", "interactive"))
+        stats.attempts += 1
+
+        cache_key = None
+        # 생성 옵션이 붙은 요청(예열 등)은 캐시하지 않는다
+        if response_cache is not None and not any(k != "parse_decision" for k in kwargs):
+            cache_key = response_cache.key(provider_name, model, PROVIDER_TEMPERATURE.get(provider_name), prompt)
+            cached = await response_cache.get(cache_key)
+            RESPONSE_CACHE.inc(provider_name, model, "miss" if cached is None else "hit")
+            if cached is not None:
+                # 같은 프롬프트에 답한 적이 있다: 모델 대신 저장된 응답을 재생한다 (LLM 지표에는 넣지 않음)
+                started = time.perf_counter()
+                response, chunks, _ = await stream_completion(ReplayChatModel(text=cached), prompt, stats,
+                                                              started, **kwargs)
+                stats.generation_time = time.perf_counter() - started
+                stats.completion_tokens = chunks
+                stats.prompt_tokens = estimate_tokens(prompt_text(prompt))
+                return response
+
+        queued = time.perf_counter()
+        async with scheduler.slot(provider_name, configurable.get("thread_id"), priority) as provider_slot:
+            started = time.perf_counter()
+            stats.queue_wait += started - queued
+            try:
+                if provider_name == "google":
+                    response, chunks, usage = await stream_gemini(model, key, prompt, stats, started,
+                                                                 configurable.get("thread_id"), **kwargs)
+                else:
+                    response, chunks, usage = await stream_ollama(model, prompt, stats, started, **kwargs)
+            except Exception as e:
+                if is_rate_limited(e):
+                    provider_slot.throttled()
+                raise
+            provider_slot.succeeded()
+
+        stats.generation_time = time.perf_counter() - started
+        stats.completion_tokens = usage["output_tokens"] if usage else chunks
+        stats.prompt_tokens = usage["input_tokens"] if usage else estimate_tokens(prompt_text(prompt))
+        stats.record()
+        if cache_key is not None:
+            await response_cache.put(cache_key, provider_name, model, response.text)
+        return response
+
+    def new_stats(config, node=None):
+        provider_name, model, _ = resolve_model(config)
+        return CallStats(provider_name, model, node or config.get("metadata", {}).get("langgraph_node"))
+
+    async def summarize_history(topic, summary, messages, config):
+        response = await invoke_llm(
+            SUMMARY_PROMPT.format(
+                topic=topic,
+                summary=summary or "(없음)",
+                messages=messages,
+                max_chars=1500
+            ),
+            config,
+            priority=PRIORITY_BACKGROUND,
+            stats=new_stats(config, "summary")
+        )
+        return response.content
+
+    history_engine = HistoryEngine(summarize_history, window=history_window)
+
+    def build_prompt(view, config, turn, node=None):
+        budget = token_budget or get_token_budget(resolve_model(config, node)[1])
+        summary, recent = history_engine.select(view, budget)
+        return build_messages(view["current_topic"], summary, recent, turn)
+
+    def prepare_history(state, config):
+        # 백그라운드 요약이 끝났으면 반영하고, 다음 요약을 예약한다
+        thread_id = config["configurable"].get("thread_id")
+        updates = history_engine.collect(thread_id, state)
+        view = {**state, **updates}
+        history_engine.schedule(thread_id, view, config)
+        return view, updates
+
+    async def precheck_utterance(view, config):
+        response = await invoke_llm(
+            build_prompt(view, config, PRECHECK_TURN),
+            config,
+            priority=PRIORITY_BACKGROUND,
+            stats=new_stats(config, "precheck")
+        )
+        return response.content
+
+    async def warm_prompt(prefix, config, node):
+        # Only worth it on Ollama, and only with a free slot: a queued warm-up would arrive too late
+        provider_name, model, _ = resolve_model(config, node)
+        if provider_name != "ollama" or not scheduler.provider(provider_name).has_idle_slot():
+            return
+        await invoke_llm(prefix, config, priority=PRIORITY_BACKGROUND,
+                         stats=CallStats(provider_name, model, "warmup"), node=node,
+                         options={"num_predict": 1})
+
+    pipeline = Pipeline(precheck_utterance, warm_prompt)
+
+    # 게이트 이름 -> 게이트 (상태는 그래프 state에 있으므로 세션끼리 공유한다)
+    gates = {}
+
+    def get_gate(name):
+        if name not in gates:
+            gates[name] = create_gate(name)
+        return gates[name]
+
+    def finish_turn(view, utterance, config):
+        """Start the pipelined work for the next node once this node's utterance is known."""
+        if not config["configurable"].get("pipelined"):
+            return
+        node = config.get("metadata", {}).get("langgraph_node")
+        next_node = NEXT_NODE.get(node)
+        if next_node is None:
+            return
+        thread_id = config["configurable"].get("thread_id")
+        view = {**view, "history": view["history"] + [utterance]}
+
+        # 찬성측 발언은 반대측이 발언하는 동안 미리 점검해 둔다
+        if node == "debater_A":
+            pipeline.start_precheck(thread_id, len(view["history"]) - 1, view, config)
+
+        # 다음 노드의 프롬프트는 마지막 메시지(차례 지시)만 빼면 지금까지의 기록 그대로다
+        prefix = build_prompt(view, config, "", next_node)[:-1]
+        pipeline.warm(thread_id, prefix, config, next_node)
+
+    async def moderator_node(state: DebateState, config: RunnableConfig):
+        stats = new_stats(config)
+        view, updates = prepare_history(state, config)
         
         # Turn limit check
         if len(state['history']) >= MAX_TURNS:
             instruction = "토론이 최대 턴 수에 도달하여 종료합니다. 모두 수고하셨습니다."
-            state["history"].append(f"사회자: {instruction}")
-            return {"decision": "stop", "history": state["history"]}
+            return {"decision": "stop", **speak(state, "moderator", instruction), **updates,
+                    "turn_stats": stats.finish_node()}
 
         # 사회자 판단
         if len(state['history']) == 0:
-            content = await invoke_llm(
-                MODERATOR_INIT_PROMPT.format(
-                    topic=state["current_topic"]
-                )
-            )
-        else:
-            content = await invoke_llm(
-                MODERATOR_PROMPT.format(
-                    topic=state["current_topic"],
-                    history=history_str
-                )
-            )
-        
-        decision = 'continue' # Default to continue
-        instruction = ''
-        
-        # Handle think blocks if present (common in some models)
-        if '</think>' in content:
-            content_after_think = content[content.find('</think>')+8:].strip()
+            response = await invoke_llm(build_prompt(view, config, MODERATOR_OPENING), config, stats=stats,
+                                        parse_decision=True)
         else:
-            content_after_think = content
+            configurable = config["configurable"]
+            note = None
+            if configurable.get("pipelined"):
+                note = pipeline.take_precheck(configurable.get("thread_id"),
+                                              (state.get("last_index") or {}).get("debater_A"))
+                if note and PRECHECK_OK in note:
+                    note = None
 
-        # Parse Decision
-        lines = content_after_think.strip().split('\n')
-        last_line = lines[-1].strip()
-        
-        if 'Decision:' in last_line:
-            decision_part = last_line.split('Decision:')[1].strip().lower()
-            if 'stop' in decision_part:
-                decision = 'stop'
-            elif 'instruction' in decision_part:
-                decision = 'instruction'
-            else:
-                decision = 'continue'
-            
-            # Remove the decision line from the content to be displayed
-            instruction = "\n".join(lines[:-1]).strip()
-        else:
+            # 반복/주제 이탈/종료 시점이 아니면 LLM 사회자 없이 다음 라운드로 넘긴다
+            gate = get_gate(configurable.get("moderator_gate"))
+            if gate is not None:
+                reason = gate.check(state)
+                if reason == ROUTINE and note is not None:
+                    reason = "precheck"
+                MODERATOR_GATE.inc(reason)
+                if reason == ROUTINE:
+                    spoken = speak(state, "moderator", MODERATOR_CONTINUE)
+                    finish_turn(view, spoken["history"][0], config)
+                    return {"decision": "continue", "gate_skips": state.get("gate_skips", 0) + 1,
+                            **spoken, **updates, "turn_stats": stats.finish_node()}
+
+            turn = MODERATOR_TURN
+            if note:
+                # 찬성측 발언의 사전 검토 결과는 차례 지시에 붙인다 (앞부분은 예열된 그대로)
+                turn += f"\n[찬성 측 발언 사전 검토]\n{note}\n"
+            response = await invoke_llm(build_prompt(view, config, turn), config, stats=stats,
+                                        parse_decision=True)
+
+        # think 블록과 Decision 줄은 스트리밍 중에 이미 분리되어 있다
+        instruction = response.content
+        decision = response.decision
+        if decision is None:
             # Fallback logic if no explicit decision
-            if 'stop' in content_after_think.lower() and len(state['history']) > 10:
+            decision = 'continue'
+            if 'stop' in instruction.lower() and len(state['history']) > 10:
                 decision = 'stop'
             elif len(state['history']) == 0:
                 decision = 'instruction'
-            
-            instruction = content_after_think
 
         # Force continue if too short
         if decision == 'stop' and len(state['history']) < 6:
              decision = 'continue'
              instruction += "\n(아직 토론이 충분하지 않아 계속 진행합니다.)"
 
-        state["history"].append(f"사회자: {instruction}")
-        return {"decision": decision, "history": state["history"]}
-
-    def debater_node_factory(debater_name: str):
-        async def node_func(state: DebateState):
-            recent_history = "\n".join(state["history"])
-            instruction = get_last_instructions(state["history"])
-            
-            prompt = DEBATER_PROMPT.format(
-                name=debater_name,
-                topic=state["current_topic"],
-                recent_history=recent_history,
-                moderator_instruction=instruction
-            )
+        spoken = speak(state, "moderator", instruction)
+        if decision != "stop":
+            finish_turn(view, spoken["history"][0], config)
+        return {"decision": decision, "gate_skips": 0, **spoken, **updates,
+                "turn_stats": stats.finish_node()}
+
+    def debater_node_factory(node: str):
+        async def node_func(state: DebateState, config: RunnableConfig):
+            stats = new_stats(config)
+            view, updates = prepare_history(state, config)
+            instruction = get_last_instructions(state)
+
+            turn = DEBATER_TURN.format(name=SPEAKER_NAMES[node], moderator_instruction=instruction)
+            response = await invoke_llm(build_prompt(view, config, turn), config, stats=stats)
 
-            content = await invoke_llm(prompt)
-            
-            if '</think>' in content:
-                cleaned_response = content[content.find('</think>')+8:].strip()
-            else:
-                cleaned_response = content.strip()
-            
-            state["history"].append(f"{debater_name}: {cleaned_response}")
-            return {"history": state["history"]}
+            spoken = speak(state, node, response.content)
+            finish_turn(view, spoken["history"][0], config)
+            return {**spoken, **updates,
+                    "turn_stats": stats.finish_node()}
         return node_func
 
     # 그래프 구성
@@ -201,8 +390,8 @@ def create_debate_app(model_name: str, provider: str, api_key: str = None):
 
     # 노드 추가
     workflow.add_node("moderator", moderator_node)
-    workflow.add_node("debater_A", debater_node_factory("찬성"))
-    workflow.add_node("debater_B", debater_node_factory("반대"))
+    workflow.add_node("debater_A", debater_node_factory("debater_A"))
+    workflow.add_node("debater_B", debater_node_factory("debater_B"))
 
     # 엣지 설정
     workflow.add_edge("debater_A", "debater_B")
@@ -224,12 +413,26 @@ def create_debate_app(model_name: str, provider: str, api_key: str = None):
     workflow.set_entry_point("moderator")
     
     # Use MemorySaver for checkpointing
-    from langgraph.checkpoint.memory import MemorySaver
-    checkpointer = MemorySaver()
+    if checkpointer is None:
+        checkpointer = MemorySaver(serde=checkpoint_serde())
     
     # Compile with interrupts and checkpointer
     app = workflow.compile(
         checkpointer=checkpointer,
         interrupt_after=["moderator", "debater_A", "debater_B"]
     )
-    return app
\ No newline at end of file
+    return app
+
+def create_debate_app(model_name: str, provider: str, api_key: str = None,
+                      history_window: int = DEFAULT_WINDOW, token_budget: int = None):
+    return build_debate_graph(model_name, provider, api_key,
+                              history_window=history_window, token_budget=token_budget)
+
+_shared_app = None
+
+def get_shared_debate_app(checkpointer=None):
+    """The process-wide graph, compiled once; sessions are told apart by their config."""
+    global _shared_app
+    if _shared_app is None:
+        _shared_app = build_debate_graph(checkpointer=checkpointer)
+    return _shared_app
\ No newline at end of file
@@ -0,0 +1,130 @@
+import os
+
+from sse import sse_event
+from stream_parser import ResponseParser, THINK, VISIBLE, DECISION, RESET
+
+# 그래프 노드 -> 클라이언트 역할
+NODE_ROLES = {
+    "moderator": "moderator",
+    "debater_A": "proponent",
+    "debater_B": "opponent"
+}
+
+# astream_events filters: LLM tokens plus the start/stream/end events of our three nodes.
+# Everything else (channel writes, the root graph, nested runnables) is dropped before
+# it reaches Python code here.
+EVENT_FILTERS = {
+    "include_types": ["chat_model"],
+    "include_names": list(NODE_ROLES)
+}
+
+# 추론(<think>) 토큰을 클라이언트에 보낼지 기본값 (세션별로 show_reasoning으로 덮어쓸 수 있음)
+DEFAULT_SHOW_REASONING = os.environ.get("DEBATE_SHOW_REASONING", "0") == "1"
+
+
+class TurnDispatcher:
+    """Turns graph events into SSE frames for one /next_turn stream.
+
+    Keeps per-turn state so a node's text is sent once: as tokens when the
+    platform streams them, otherwise as the full text from its state update.
+    Tokens go through a ``ResponseParser`` per role: reasoning is dropped
+    (or sent as "reasoning" frames with ``show_reasoning``) and the
+    moderator's decision is sent as soon as it can be read.
+    """
+
+    def __init__(self, coalescer, on_node_end=None, show_reasoning: bool = DEFAULT_SHOW_REASONING):
+        self.coalescer = coalescer
+        self.on_node_end = on_node_end
+        self.show_reasoning = show_reasoning
+        self.ended = False
+        # roles that already received tokens this turn
+        self._streamed = set()
+        # role -> parser of the response being streamed
+        self._parsers = {}
+        self._segment_handlers = {
+            VISIBLE: self._on_visible,
+            THINK: self._on_reasoning,
+            DECISION: self._on_decision,
+            RESET: self._on_reset
+        }
+        self._handlers = {
+            "on_chat_model_stream": self._on_token,
+            "on_chain_stream": self._on_node_stream,
+            "on_chain_end": self._on_node_end
+        }
+
+    def partial(self):
+        """(role, visible text so far) of a node that hasn't finished, or None."""
+        if not self._parsers:
+            return None
+        role, parser = next(iter(self._parsers.items()))
+        return {"role": role, "content": parser.content}
+
+    def dispatch(self, event) -> str:
+        handler = self._handlers.get(event["event"])
+        return handler(event) if handler else ""
+
+    def _on_token(self, event):
+        content = event["data"]["chunk"].content
+        role = NODE_ROLES.get(event["metadata"].get("langgraph_node"))
+        if not content or role is None:
+            return ""
+        self._streamed.add(role)
+        parser = self._parsers.get(role)
+        if parser is None:
+            parser = self._parsers[role] = ResponseParser(parse_decision=role == "moderator")
+        return self._send_segments(role, parser.feed(content))
+
+    def _send_segments(self, role, segments):
+        return "".join(self._segment_handlers[kind](role, text) for kind, text in segments)
+
+    def _on_visible(self, role, text):
+        return self.coalescer.add(role, text)
+
+    def _on_reasoning(self, role, text):
+        return self.coalescer.add(role, text, "reasoning") if self.show_reasoning else ""
+
+    def _on_decision(self, role, decision):
+        # 잠정 판단: 노드가 최종적으로 바꿀 수 있다 (최종 판단은 turn_end/end로 온다)
+        return self.coalescer.flush() + sse_event({"type": "decision", "role": role, "decision": decision})
+
+    def _on_reset(self, role, _):
+        # 이미 보낸 토큰은 추론이었다: 클라이언트는 이 역할의 말풍선을 비운다
+        return self.coalescer.flush() + sse_event({"type": "reset", "role": role})
+
+    def _on_node_stream(self, event):
+        # Fallback for platforms where chat model tokens don't surface (e.g. RPi):
+        # send the node's new utterance in one frame.
+        role = NODE_ROLES.get(event["name"])
+        if role is None or role in self._streamed:
+            return ""
+        chunk = event["data"].get("chunk")
+        if not isinstance(chunk, dict) or not chunk.get("history"):
+            return ""
+        content = chunk["history"][-1].text
+        if not content:
+            return ""
+        self._streamed.add(role)
+        return self.coalescer.flush() + sse_event({"type": "token", "role": role, "content": content})
+
+    def _on_node_end(self, event):
+        node_name = event["name"]
+        if node_name not in NODE_ROLES:
+            return ""
+        output = event["data"].get("output")
+        if self.on_node_end is not None:
+            self.on_node_end(node_name, output)
+
+        frames = ""
+        parser = self._parsers.pop(NODE_ROLES[node_name], None)
+        if parser is not None:
+            frames = self._send_segments(NODE_ROLES[node_name], parser.close())
+
+        turn_end = {"type": "turn_end", "role": node_name}
+        if isinstance(output, dict) and output.get("turn_stats"):
+            turn_end["metrics"] = output["turn_stats"]
+        frames += self.coalescer.flush() + sse_event(turn_end)
+        if node_name == "moderator" and isinstance(output, dict) and output.get("decision") == "stop":
+            self.ended = True
+            frames += sse_event({"type": "end"})
+        return frames
@@ -0,0 +1,113 @@
+import logging
+
+from utils import match_model, spawn_detached
+
+logger = logging.getLogger("debate.history")
+
+# 최근 K개의 발언만 원문으로 유지하고, 그 이전 발언은 요약으로 접어 넣는다.
+DEFAULT_WINDOW = 8
+# 요약은 발언이 이만큼 쌓일 때마다 한 번에 접는다 (프롬프트 앞부분이 매 턴 바뀌지 않도록)
+DEFAULT_FOLD_EVERY = 4
+
+# 모델별 history 토큰 예산 (모델 이름 prefix 매칭, 가장 긴 prefix 우선)
+DEFAULT_TOKEN_BUDGET = 4000
+MODEL_TOKEN_BUDGETS = {
+    "gemini": 24000,
+    "gemma3": 6000,
+    "qwq": 6000,
+    "llama3": 3000,
+}
+
+SUMMARY_PROMPT = """당신은 토론 기록을 정리하는 서기입니다.
+주제: {topic}
+
+아래의 기존 요약과 새 발언들을 합쳐 토론 요약을 갱신하세요.
+- 각 측(사회자/찬성/반대)의 핵심 주장과 근거, 사회자의 지시사항을 보존하세요.
+- 이미 나온 논점은 중복 없이 한 번만 적으세요.
+- {max_chars}자 이내로 작성하세요.
+
+기존 요약:
+{summary}
+
+새 발언:
+{messages}
+
+갱신된 요약:"""
+
+
+def get_token_budget(model_name: str) -> int:
+    """Return the history token budget for a model (longest matching prefix)."""
+    return match_model(MODEL_TOKEN_BUDGETS, model_name, DEFAULT_TOKEN_BUDGET)
+
+
+def estimate_tokens(text: str) -> int:
+    # 한글은 대략 1~2자당 1토큰이므로 보수적으로 2자당 1토큰으로 계산
+    return len(text) // 2 + 1
+
+
+class HistoryEngine:
+    """Sliding window over the debate history plus a rolling summary.
+
+    The summary is folded in the background; nodes pick up a finished summary
+    on their next turn via ``collect`` and return it as a state update.
+    """
+
+    def __init__(self, summarize, window: int = DEFAULT_WINDOW, fold_every: int = DEFAULT_FOLD_EVERY):
+        self._summarize = summarize
+        self.window = window
+        self.fold_every = fold_every
+        # thread_id -> (summarized_upto, task)
+        self._pending = {}
+
+    def collect(self, thread_id, state) -> dict:
+        """Return state updates from a finished background summary (never blocks)."""
+        pending = self._pending.get(thread_id)
+        if not pending:
+            return {}
+        upto, task = pending
+        if not task.done():
+            return {}
+        del self._pending[thread_id]
+        if task.cancelled() or task.exception() is not None:
+            logger.warning("History summary failed for %s: %r", thread_id, None if task.cancelled() else task.exception())
+            return {}
+        if upto <= state.get("summarized_upto", 0):
+            return {}
+        return {"summary": task.result(), "summarized_upto": upto}
+
+    def schedule(self, thread_id, state, config):
+        """Start folding old messages into the summary if enough have piled up."""
+        if thread_id in self._pending:
+            return
+        history = state["history"]
+        summarized_upto = state.get("summarized_upto", 0)
+        target = len(history) - self.window
+        if target - summarized_upto < self.fold_every:
+            return
+
+        messages = "\n".join(utterance.render() for utterance in history[summarized_upto:target])
+        task = spawn_detached(self._summarize(state["current_topic"], state.get("summary", ""), messages, config))
+        self._pending[thread_id] = (target, task)
+
+    def select(self, state, token_budget: int = DEFAULT_TOKEN_BUDGET):
+        """Return (summary, recent messages) for a prompt within the token budget.
+
+        Over budget, the oldest messages are dropped ``fold_every`` at a time
+        rather than one per turn, so the start of the transcript (and with it
+        the prompt prefix) stays put between folds.
+        """
+        history = state["history"]
+        summary = state.get("summary", "")
+        start = state.get("summarized_upto", 0)
+
+        budget = token_budget - (estimate_tokens(summary) if summary else 0)
+        # 발언마다 토큰 수는 만들 때 한 번만 센다
+        costs = [utterance.tokens for utterance in history[start:]]
+        total = sum(costs)
+        dropped = 0
+        # 최소한 마지막 발언 하나는 항상 포함
+        while total > budget and dropped < len(costs) - 1:
+            step = min(self.fold_every, len(costs) - 1 - dropped)
+            total -= sum(costs[dropped:dropped + step])
+            dropped += step
+        return summary, history[start + dropped:]
@@ -0,0 +1,137 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import httpx
+
+from ollama_pool import OLLAMA_HOSTS
+from model_warmer import OLLAMA_KEEP_ALIVE
+
+logger = logging.getLogger("debate.llm")
+
+# 기본 Ollama 서버 (여러 대일 때 실제 요청은 ollama_pool이 호스트를 고른다)
+OLLAMA_BASE_URL = OLLAMA_HOSTS[0]
+
+# 프로세스 전체에서 재사용하는 LLM 클라이언트 수 (초과 시 가장 오래 안 쓴 것부터 정리)
+MAX_CLIENTS = 32
+
+# Keep-alive pool shared by all requests going through one client
+OLLAMA_CLIENT_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=16, keepalive_expiry=300)
+
+# 프로바이더별 temperature (None이면 모델 기본값; 응답 캐시 키에도 들어간다)
+PROVIDER_TEMPERATURE = {"google": 0.7, "ollama": None}
+
+# 서버 시작 직후 백그라운드에서 미리 불러 둘 프로바이더 (쉼표 구분)
+PRELOAD_PROVIDERS = [name.strip() for name in os.environ.get("DEBATE_PRELOAD_PROVIDERS", "ollama").split(",")
+                     if name.strip()]
+
+_clients = OrderedDict()
+_lock = threading.Lock()
+
+
+def _load_ollama():
+    from langchain_ollama import ChatOllama
+    from ollama import ResponseError
+
+    def create(model_name: str, api_key: str = None, base_url: str = None):
+        return ChatOllama(
+            base_url=base_url or OLLAMA_BASE_URL,
+            model=model_name,
+            # 토론 중 턴 사이에 모델이 내려가지 않도록 (Ollama 기본 5분보다 길게)
+            keep_alive=OLLAMA_KEEP_ALIVE,
+            client_kwargs={"limits": OLLAMA_CLIENT_LIMITS}
+        )
+
+    def is_rate_limited(exc: BaseException) -> bool:
+        # 요청이 밀린 Ollama 큐
+        return isinstance(exc, ResponseError) and exc.status_code == 429
+
+    return create, is_rate_limited
+
+
+def _load_google():
+    from google.api_core.exceptions import ResourceExhausted
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    def create(model_name: str, api_key: str = None, base_url: str = None):
+        if not api_key and "GOOGLE_API_KEY" not in os.environ:
+            logger.warning("GOOGLE_API_KEY not found.")
+        return ChatGoogleGenerativeAI(model=model_name, temperature=PROVIDER_TEMPERATURE["google"],
+                                      google_api_key=api_key)
+
+    def is_rate_limited(exc: BaseException) -> bool:
+        # Gemini 할당량 초과
+        return isinstance(exc, ResourceExhausted)
+
+    return create, is_rate_limited
+
+
+# 프로바이더 이름 -> 백엔드 로더. 각 SDK는 그 프로바이더를 처음 쓸 때 import한다
+# (import만 해도 1초 가까이 걸려서, 워커와 배치 프로세스가 쓰지 않는 SDK까지 불러오지 않게).
+# 로더는 (create(model_name, api_key, base_url), is_rate_limited(exc))를 돌려준다.
+PROVIDER_LOADERS = {
+    "ollama": _load_ollama,
+    "google": _load_google
+}
+
+# 불러온 프로바이더 -> 백엔드, 그리고 import에 걸린 시간 (초)
+_backends = {}
+provider_load_times = {}
+_backends_lock = threading.Lock()
+
+
+def load_provider(provider: str):
+    """Import the backend of ``provider`` once and return it (unknown providers use Ollama)."""
+    if provider not in PROVIDER_LOADERS:
+        provider = "ollama"
+    backend = _backends.get(provider)
+    if backend is not None:
+        return backend
+    with _backends_lock:
+        backend = _backends.get(provider)
+        if backend is None:
+            started = time.perf_counter()
+            backend = PROVIDER_LOADERS[provider]()
+            provider_load_times[provider] = time.perf_counter() - started
+            logger.info("Loaded %s provider in %.2fs", provider, provider_load_times[provider])
+            _backends[provider] = backend
+        return backend
+
+
+def preload_providers(providers=None):
+    """Import provider backends ahead of the first request (run it off the event loop)."""
+    for provider in PRELOAD_PROVIDERS if providers is None else providers:
+        try:
+            load_provider(provider)
+        except ImportError as e:
+            logger.warning("Could not load %s provider: %r", provider, e)
+
+
+def is_rate_limited(exc: BaseException) -> bool:
+    """True for provider 429s: Gemini quota errors and a busy Ollama queue."""
+    # 불러오지 않은 프로바이더에서는 예외가 나올 수 없다
+    return any(check(exc) for _, check in list(_backends.values()))
+
+
+def get_llm(provider: str, model_name: str, api_key: str = None, base_url: str = None):
+    """Return a warm, shared chat model for (provider, model, api_key, base_url)."""
+    key = (provider, model_name, api_key, base_url)
+    with _lock:
+        llm = _clients.get(key)
+        if llm is not None:
+            _clients.move_to_end(key)
+            return llm
+
+        create, _ = load_provider(provider)
+        llm = create(model_name, api_key, base_url)
+        _clients[key] = llm
+        while len(_clients) > MAX_CLIENTS:
+            _clients.popitem(last=False)
+        return llm
+
+
+def clear_clients():
+    with _lock:
+        _clients.clear()
@@ -0,0 +1,195 @@
+import asyncio
+import itertools
+import logging
+import os
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger("debate.scheduler")
+
+# 우선순위: 값이 작을수록 먼저 (브라우저 세션 > 배치 작업 > 백그라운드 요약)
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 1
+PRIORITY_BACKGROUND = 2
+
+PRIORITIES = {
+    "interactive": PRIORITY_INTERACTIVE,
+    "batch": PRIORITY_BATCH,
+    "background": PRIORITY_BACKGROUND
+}
+
+# provider별 동시 요청 수와 분당 요청 수 (rpm이 None이면 속도 제한 없음)
+PROVIDER_LIMITS = {
+    "ollama": {
+        "concurrency": int(os.environ.get("OLLAMA_MAX_CONCURRENCY", 4)),
+        "rpm": None
+    },
+    "google": {
+        "concurrency": int(os.environ.get("GOOGLE_MAX_CONCURRENCY", 4)),
+        "rpm": int(os.environ.get("GOOGLE_RPM", 60))
+    }
+}
+
+# 429 발생 시 provider 전체를 멈추는 시간: 4s, 8s, 16s ... 최대 60s
+BACKOFF_MIN = 4
+BACKOFF_MAX = 60
+
+
+class TokenBucket:
+    def __init__(self, rate_per_sec: float, capacity: float):
+        self.rate = rate_per_sec
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    def take(self, now: float) -> float:
+        """Take a token; returns 0 on success, else seconds until one is available."""
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+
+class ProviderScheduler:
+    """Admits LLM calls for one provider.
+
+    Each session has its own FIFO queue. A free slot goes to the session whose
+    head request has the best priority, then the lowest virtual time, so a
+    debate that has just been served goes behind debates that haven't
+    (fair queueing). A 429 from any session pauses the whole provider with a
+    shared exponential backoff instead of every call sleeping on its own.
+    """
+
+    def __init__(self, name: str, concurrency: int, rpm: int = None):
+        self.name = name
+        self.concurrency = concurrency
+        self._bucket = TokenBucket(rpm / 60, max(1, rpm / 10)) if rpm else None
+        self._active = 0
+        # session_id -> deque of (priority, seq, future)
+        self._queues = {}
+        self._seq = itertools.count()
+        # session_id -> virtual time of its next grant
+        self._vtime = {}
+        self._global_vtime = 0
+        self._paused_until = 0.0
+        self._throttle_count = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    def has_idle_slot(self) -> bool:
+        return self._active < self.concurrency and not self._queues
+
+    async def acquire(self, session_id: str, priority: int = PRIORITY_INTERACTIVE):
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(session_id, deque()).append((priority, next(self._seq), future))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted right as we were cancelled: hand the slot back
+                self.release()
+            raise
+        try:
+            await self._wait_ready()
+        except asyncio.CancelledError:
+            self.release()
+            raise
+
+    def release(self):
+        self._active -= 1
+        self._dispatch()
+
+    def throttled(self):
+        """Called on a 429: pause every caller of this provider."""
+        self._throttle_count += 1
+        delay = min(BACKOFF_MAX, BACKOFF_MIN * 2 ** (self._throttle_count - 1))
+        delay *= random.uniform(0.8, 1.2)
+        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        logger.warning("%s rate limited; pausing all requests for %.1fs", self.name, delay)
+
+    def succeeded(self):
+        self._throttle_count = 0
+
+    def _dispatch(self):
+        while self._active < self.concurrency and self._queues:
+            best = None
+            for session_id, queue in list(self._queues.items()):
+                # 대기 중 취소된 요청은 버린다
+                while queue and queue[0][2].done():
+                    queue.popleft()
+                if not queue:
+                    del self._queues[session_id]
+                    continue
+                priority, seq, _ = queue[0]
+                key = (priority, max(self._vtime.get(session_id, 0), self._global_vtime), seq)
+                if best is None or key < best[0]:
+                    best = (key, session_id)
+            if best is None:
+                break
+
+            (_, vtime, _), session_id = best
+            queue = self._queues[session_id]
+            _, _, future = queue.popleft()
+            if not queue:
+                del self._queues[session_id]
+            self._active += 1
+            self._global_vtime = vtime
+            self._vtime[session_id] = vtime + 1
+            future.set_result(None)
+        if len(self._vtime) > 1024:
+            # 이미 전역 시간보다 뒤처진 세션은 기록할 필요가 없다
+            self._vtime = {s: v for s, v in self._vtime.items() if v > self._global_vtime}
+
+    async def _wait_ready(self):
+        while True:
+            now = time.monotonic()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            if self._bucket is None:
+                return
+            wait = self._bucket.take(now)
+            if wait == 0:
+                return
+            await asyncio.sleep(wait)
+
+
+class LLMScheduler:
+    def __init__(self, limits: dict = PROVIDER_LIMITS):
+        self._limits = limits
+        self._providers = {}
+
+    def provider(self, name: str) -> ProviderScheduler:
+        scheduler = self._providers.get(name)
+        if scheduler is None:
+            limits = self._limits.get(name, self._limits["ollama"])
+            scheduler = ProviderScheduler(name, limits["concurrency"], limits["rpm"])
+            self._providers[name] = scheduler
+        return scheduler
+
+    @asynccontextmanager
+    async def slot(self, provider: str, session_id: str, priority: int = PRIORITY_INTERACTIVE):
+        scheduler = self.provider(provider)
+        await scheduler.acquire(session_id, priority)
+        try:
+            yield scheduler
+        finally:
+            scheduler.release()
+
+
+_scheduler = LLMScheduler()
+
+
+def get_scheduler() -> LLMScheduler:
+    return _scheduler
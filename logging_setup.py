@@ -0,0 +1,32 @@
+import logging
+import os
+
+# 기본은 INFO: DEBUG 로그는 꺼져 있고, 꺼져 있을 때는 포맷팅 비용도 들지 않는다
+LOG_LEVEL = os.environ.get("DEBATE_LOG_LEVEL", "INFO").upper()
+# DEBUG일 때 토큰 단위 로그는 N개마다 1개만 남긴다 (0이면 토큰 로그 끔)
+TOKEN_LOG_EVERY = int(os.environ.get("DEBATE_TOKEN_LOG_EVERY", 50))
+
+
+def configure_logging(level: str = LOG_LEVEL):
+    logging.basicConfig(
+        level=level,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+    # httpx logs every LLM request at INFO
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+class TokenLogSampler:
+    """Decides which per-token events get logged: the first one, then every Nth."""
+
+    __slots__ = ("every", "_count")
+
+    def __init__(self, every: int = TOKEN_LOG_EVERY):
+        self.every = every
+        self._count = 0
+
+    def __call__(self) -> bool:
+        if self.every <= 0:
+            return False
+        self._count += 1
+        return self._count % self.every == 1 or self.every == 1
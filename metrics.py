@@ -0,0 +1,158 @@
+"""In-process metrics with Prometheus text exposition (served at /metrics)."""
+import time
+
+# 초 단위 지연 시간 버킷
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200)
+SIZE_BUCKETS = (250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+
+
+def _escape(value) -> str:
+    # Prometheus 텍스트 형식: 레이블 값의 \, ", 줄바꿈은 이스케이프해야 한다
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=""):
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values = {}
+
+    def inc(self, *label_values, amount=1.0):
+        self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for label_values, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [bucket counts..., sum, count]
+        self._series = {}
+
+    def observe(self, value, *label_values):
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [0] * len(self.buckets) + [0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label_values, series in self._series.items():
+            for bound, count in zip(self.buckets, series):
+                labels = _format_labels(self.labels, label_values, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.labels, label_values, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {series[-1]}")
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {series[-2]}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+LLM_LABELS = ("provider", "model", "node")
+
+TTFT = Histogram("debate_llm_ttft_seconds", "Time from request to first streamed token", LLM_LABELS)
+LLM_DURATION = Histogram("debate_llm_duration_seconds", "Wall time of one LLM completion", LLM_LABELS)
+TOKENS_PER_SEC = Histogram("debate_llm_tokens_per_second", "Generation throughput after the first token",
+                           LLM_LABELS, RATE_BUCKETS)
+PROMPT_TOKENS = Histogram("debate_llm_prompt_tokens", "Prompt size in tokens (estimated if not reported)",
+                          LLM_LABELS, SIZE_BUCKETS)
+COMPLETION_TOKENS = Counter("debate_llm_completion_tokens_total", "Generated tokens", LLM_LABELS)
+RETRIES = Counter("debate_llm_retries_total", "LLM calls retried after a rate limit", LLM_LABELS)
+QUEUE_WAIT = Histogram("debate_llm_queue_wait_seconds",
+                       "Time waiting for a scheduler slot, rate limit or shared backoff", LLM_LABELS)
+NODE_DURATION = Histogram("debate_node_duration_seconds", "Wall time of a graph node", LLM_LABELS)
+RESPONSE_CACHE = Counter("debate_response_cache_total", "Response cache lookups by result (hit/miss)",
+                         ("provider", "model", "result"))
+
+MODERATOR_GATE = Counter("debate_moderator_gate_total",
+                         "Moderator turns by local gate verdict (routine = LLM skipped)", ("reason",))
+
+ADMISSION = Counter("debate_admission_total",
+                    "Turn and session admission decisions (admitted/queued/rejected/timed_out)",
+                    ("provider", "model", "result"))
+TURN_QUEUE_WAIT = Histogram("debate_turn_queue_wait_seconds", "Time a turn waited for admission",
+                            ("provider", "model"))
+
+REGISTRY = [TTFT, LLM_DURATION, TOKENS_PER_SEC, PROMPT_TOKENS, COMPLETION_TOKENS, RETRIES, QUEUE_WAIT,
+            NODE_DURATION, RESPONSE_CACHE, MODERATOR_GATE, ADMISSION, TURN_QUEUE_WAIT]
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class CallStats:
+    """Timings for one node's LLM call, accumulated across retries."""
+
+    __slots__ = ("labels", "started", "attempts", "queue_wait", "ttft", "completion_tokens",
+                 "prompt_tokens", "generation_time")
+
+    def __init__(self, provider, model, node):
+        self.labels = (provider, model, node)
+        self.started = time.perf_counter()
+        self.attempts = 0
+        self.queue_wait = 0.0
+        self.ttft = None
+        self.completion_tokens = 0
+        self.prompt_tokens = 0
+        self.generation_time = 0.0
+
+    def record(self):
+        """Publish one finished LLM call to the histograms."""
+        if self.attempts > 1:
+            RETRIES.inc(*self.labels, amount=self.attempts - 1)
+        QUEUE_WAIT.observe(self.queue_wait, *self.labels)
+        if self.ttft is not None:
+            TTFT.observe(self.ttft, *self.labels)
+        LLM_DURATION.observe(self.generation_time, *self.labels)
+        PROMPT_TOKENS.observe(self.prompt_tokens, *self.labels)
+        COMPLETION_TOKENS.inc(*self.labels, amount=self.completion_tokens)
+        if self.tokens_per_sec is not None:
+            TOKENS_PER_SEC.observe(self.tokens_per_sec, *self.labels)
+
+    @property
+    def tokens_per_sec(self):
+        if self.ttft is None or self.generation_time <= self.ttft or not self.completion_tokens:
+            return None
+        return self.completion_tokens / (self.generation_time - self.ttft)
+
+    def finish_node(self) -> dict:
+        """Record the node's wall time and return the per-turn summary sent with turn_end."""
+        duration = time.perf_counter() - self.started
+        NODE_DURATION.observe(duration, *self.labels)
+        tokens_per_sec = self.tokens_per_sec
+        return {
+            "provider": self.labels[0],
+            "model": self.labels[1],
+            "node_seconds": round(duration, 3),
+            "queue_wait_seconds": round(self.queue_wait, 3),
+            "ttft_seconds": round(self.ttft, 3) if self.ttft is not None else None,
+            "tokens_per_second": round(tokens_per_sec, 1) if tokens_per_sec is not None else None,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "retries": max(0, self.attempts - 1)
+        }
@@ -0,0 +1,149 @@
+"""Local stand-in for an Ollama server, for benchmarks and offline runs.
+
+Implements the parts of the Ollama API the debate server uses (/api/tags,
+/api/chat, /api/generate, /api/ps) and streams a canned Korean reply at a
+configurable token rate.
+
+    python mock_llm.py --port 11435 --tokens-per-sec 40 --latency 0.3 --error-rate 0.05
+    OLLAMA_BASE_URL=http://127.0.0.1:11435 python server.py
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timezone
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+REPLY = (
+    "좋은 지적입니다. 하지만 상대측 주장에는 중요한 전제가 빠져 있습니다. "
+    "첫째, 실제 사례를 보면 효과가 제한적이었습니다. 둘째, 비용 대비 효과를 따져 보아야 합니다. "
+    "셋째, 장기적인 관점에서 부작용을 고려해야 합니다. 따라서 저는 기존 입장을 유지합니다."
+)
+
+
+class MockSettings:
+    def __init__(self, tokens_per_sec=50.0, chunk_size=1, latency=0.2, reply_tokens=120,
+                 error_rate=0.0, models=("mock:latest",), load_time=0.0):
+        self.tokens_per_sec = tokens_per_sec
+        # 한 번에 보내는 토큰(어절) 수
+        self.chunk_size = chunk_size
+        # 첫 토큰까지의 지연 (prefill 시간 흉내)
+        self.latency = latency
+        self.reply_tokens = reply_tokens
+        # 요청 중 429로 거절할 비율
+        self.error_rate = error_rate
+        self.models = list(models)
+        # 메모리에 없는 모델을 올리는 시간 (콜드 로드 흉내)
+        self.load_time = load_time
+
+
+def create_mock_app(settings: MockSettings = None) -> FastAPI:
+    settings = settings or MockSettings()
+    app = FastAPI()
+    stats = {"requests": 0, "rejected": 0, "chunks": 0, "tokens": 0, "loads": 0}
+    # 메모리에 올라간 모델 (load_time이 0이면 처음부터 모두)
+    loaded = set() if settings.load_time > 0 else set(settings.models)
+    words = REPLY.split(" ")
+
+    def now():
+        return datetime.now(timezone.utc).isoformat()
+
+    async def load(model):
+        # Ollama resolves an untagged name to :latest
+        if ":" not in model:
+            model += ":latest"
+        if model not in loaded:
+            await asyncio.sleep(settings.load_time)
+            loaded.add(model)
+            stats["loads"] += 1
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": [{"name": name, "model": name} for name in settings.models]}
+
+    @app.get("/api/ps")
+    async def ps():
+        return {"models": [{"name": name, "model": name} for name in settings.models if name in loaded]}
+
+    @app.get("/mock/stats")
+    async def get_stats():
+        return stats
+
+    @app.post("/api/generate")
+    async def generate(request: Request):
+        # Model load / keep-alive requests: nothing to generate
+        body = await request.json()
+        await load(body.get("model"))
+        return {"model": body.get("model"), "created_at": now(), "response": "", "done": True,
+                "done_reason": "load"}
+
+    @app.post("/api/chat")
+    async def chat(request: Request):
+        body = await request.json()
+        model = body.get("model", settings.models[0])
+        stats["requests"] += 1
+        if random.random() < settings.error_rate:
+            stats["rejected"] += 1
+            return JSONResponse({"error": "server busy, please try again"}, status_code=429)
+
+        prompt_chars = sum(len(m.get("content", "")) for m in body.get("messages", []))
+
+        # Prompt warm-up requests ask for a single token
+        reply_tokens = (body.get("options") or {}).get("num_predict") or settings.reply_tokens
+
+        async def stream():
+            started = time.perf_counter()
+            await load(model)
+            await asyncio.sleep(settings.latency)
+            sent = 0
+            reply = (words * (reply_tokens // len(words) + 1))[:reply_tokens]
+            reply[-1] += "\nDecision: continue"
+            interval = settings.chunk_size / settings.tokens_per_sec if settings.tokens_per_sec > 0 else 0
+            for i in range(0, len(reply), settings.chunk_size):
+                piece = " ".join(reply[i:i + settings.chunk_size]) + " "
+                sent += len(reply[i:i + settings.chunk_size])
+                stats["chunks"] += 1
+                yield json.dumps({"model": model, "created_at": now(),
+                                  "message": {"role": "assistant", "content": piece}, "done": False}) + "\n"
+                if interval:
+                    await asyncio.sleep(interval)
+            stats["tokens"] += sent
+            yield json.dumps({
+                "model": model, "created_at": now(),
+                "message": {"role": "assistant", "content": ""},
+                "done": True, "done_reason": "stop",
+                "total_duration": int((time.perf_counter() - started) * 1e9),
+                "prompt_eval_count": prompt_chars // 2 + 1,
+                "eval_count": sent
+            }) + "\n"
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Ollama server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--tokens-per-sec", type=float, default=50.0)
+    parser.add_argument("--chunk-size", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--reply-tokens", type=int, default=120)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--load-time", type=float, default=0.0,
+                        help="seconds to load a model that is not resident")
+    parser.add_argument("--models", default="mock:latest", help="comma separated model names")
+    args = parser.parse_args()
+
+    settings = MockSettings(args.tokens_per_sec, args.chunk_size, args.latency, args.reply_tokens,
+                            args.error_rate, args.models.split(","), args.load_time)
+    import uvicorn
+    uvicorn.run(create_mock_app(settings), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
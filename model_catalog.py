@@ -0,0 +1,55 @@
+import asyncio
+import logging
+import time
+
+from ollama_pool import get_ollama_pool
+
+logger = logging.getLogger("debate.models")
+
+GEMINI_MODELS = [
+    "gemini-3-pro",
+    "gemini-2.5-pro",
+    "gemini-2.5-flash",
+    "gemini-2.0-flash",
+    "gemini-1.5-pro",
+    "gemini-1.5-flash"
+]
+
+
+class ModelCatalog:
+    """Cached model list with stale-while-revalidate refreshes.
+
+    ``get`` never waits on Ollama: it returns the models the pool last saw
+    on its healthy hosts and, once that is older than ``ttl``, starts a
+    background re-check of the pool.
+    """
+
+    def __init__(self, pool=None, ttl: float = 30.0):
+        self.pool = pool or get_ollama_pool()
+        self.ttl = ttl
+        self._fetched_at = None
+        self._refresh_task = None
+
+    async def refresh(self):
+        try:
+            await self.pool.check_all()
+        except Exception as e:
+            # 실패해도 이전 목록은 그대로 유지
+            logger.warning("Error listing Ollama models: %r", e)
+        self._fetched_at = time.monotonic()
+
+    def _revalidate(self):
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self.refresh())
+
+    def get(self):
+        if self._fetched_at is None or time.monotonic() - self._fetched_at > self.ttl:
+            self._revalidate()
+
+        models = [{"name": name, "provider": "ollama"} for name in self.pool.models()]
+        models += [{"name": name, "provider": "google"} for name in GEMINI_MODELS]
+        return models
+
+    def close(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
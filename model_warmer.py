@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import os
+import time
+
+import httpx
+
+from ollama_pool import get_ollama_pool, model_tag
+
+logger = logging.getLogger("debate.model_warmer")
+
+# 서버 시작 시 미리 올려 둘 Ollama 모델 (쉼표 구분)
+PRELOAD_MODELS = [name.strip() for name in os.environ.get("OLLAMA_PRELOAD_MODELS", "").split(",") if name.strip()]
+# 요청마다, 그리고 유지 신호로 보내는 keep_alive (Ollama 기본은 5분)
+OLLAMA_KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")
+# 활성 모델의 상주 여부를 확인하고 유지 신호를 보내는 주기 (초)
+KEEP_ALIVE_INTERVAL = float(os.environ.get("OLLAMA_KEEP_ALIVE_INTERVAL", 120))
+# 마지막 사용 후 이 시간(초)이 지나면 더 이상 활성 모델로 보지 않는다
+ACTIVE_WINDOW = float(os.environ.get("OLLAMA_ACTIVE_WINDOW", 1800))
+# /start_debate에서 첫 턴 요청 전에 모델을 미리 올릴지
+PREWARM_ON_START = os.environ.get("OLLAMA_PREWARM_ON_START", "1") == "1"
+# 모델을 메모리에 올리는 데 걸릴 수 있는 시간
+LOAD_TIMEOUT = 600
+
+
+class ModelWarmer:
+    """Keeps the Ollama models that debates use resident.
+
+    ``start`` preloads ``PRELOAD_MODELS`` on every host that serves them
+    and then, every ``KEEP_ALIVE_INTERVAL``, reads each host's resident
+    models from /api/ps and sends a load request with ``keep_alive`` for
+    every model in use (preloaded, or ``touch``-ed within
+    ``ACTIVE_WINDOW``) on the hosts where it is still resident, which
+    extends its expiry there. A model Ollama has dropped everywhere is
+    reloaded on the one host the pool would route it to; preloaded models
+    are reloaded on every host that serves them. ``prewarm`` starts
+    loading a model right away, e.g. when a debate is created, so the
+    first turn doesn't pay for the cold load. Nothing here ever blocks a
+    request, and a model is never loaded onto a host just to keep it warm.
+    """
+
+    def __init__(self, pool=None, preload=None, keep_alive: str = OLLAMA_KEEP_ALIVE,
+                 interval: float = KEEP_ALIVE_INTERVAL, active_window: float = ACTIVE_WINDOW):
+        self.pool = pool or get_ollama_pool()
+        self.preload = [model_tag(model) for model in (PRELOAD_MODELS if preload is None else preload)]
+        self.keep_alive = keep_alive
+        self.interval = interval
+        self.active_window = active_window
+        self._client = httpx.AsyncClient(timeout=httpx.Timeout(10.0, read=LOAD_TIMEOUT))
+        # host url -> models resident there (as of the last /api/ps)
+        self._resident = {}
+        # model -> last time a session used it
+        self._active = {}
+        # (host url, model) -> load task
+        self._loading = {}
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            for model in self.preload:
+                self._load_everywhere(model)
+            self._task = asyncio.create_task(self._keep_alive_loop())
+
+    async def aclose(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for task in self._loading.values():
+            task.cancel()
+        await self._client.aclose()
+
+    def touch(self, model: str):
+        """Note that a session is using ``model`` (keeps it resident for ``active_window``)."""
+        self._active[model_tag(model)] = time.monotonic()
+
+    def resident(self, model: str) -> bool:
+        model = model_tag(model)
+        return any(model in models for models in self._resident.values())
+
+    def prewarm(self, model: str):
+        """Start loading ``model`` on the host the pool would route it to, unless a host already has it."""
+        model = model_tag(model)
+        self.touch(model)
+        if self.resident_hosts(model):
+            return
+        endpoint = self.pool.choose(model)
+        if endpoint is not None:
+            self._load(endpoint.url, model)
+
+    def resident_hosts(self, model: str):
+        """Healthy hosts serving ``model`` that have it resident (as of the last /api/ps)."""
+        return [endpoint for endpoint in self.pool.hosts_for(model)
+                if model in self._resident.get(endpoint.url, ())]
+
+    def _load_everywhere(self, model: str):
+        for endpoint in self.pool.hosts_for(model):
+            if model not in self._resident.get(endpoint.url, ()):
+                self._load(endpoint.url, model)
+
+    def _load(self, url: str, model: str):
+        key = (url, model)
+        if key in self._loading:
+            return
+        task = asyncio.create_task(self._run_load(url, model))
+        self._loading[key] = task
+        task.add_done_callback(lambda t: self._loading.pop(key, None))
+
+    async def _run_load(self, url, model):
+        started = time.perf_counter()
+        try:
+            # 프롬프트 없는 generate 요청은 모델을 올리기만 한다
+            response = await self._client.post(f"{url}/api/generate",
+                                               json={"model": model, "keep_alive": self.keep_alive})
+            response.raise_for_status()
+        except Exception as e:
+            logger.warning("Could not load %s on %s: %r", model, url, e)
+            return
+        self._resident.setdefault(url, set()).add(model)
+        logger.info("Loaded %s on %s in %.1fs", model, url, time.perf_counter() - started)
+
+    async def refresh(self):
+        """Re-read the resident models of every healthy host."""
+        async def read(endpoint):
+            try:
+                response = await self._client.get(f"{endpoint.url}/api/ps")
+                response.raise_for_status()
+                self._resident[endpoint.url] = {m["name"] for m in response.json().get("models", [])}
+            except Exception as e:
+                logger.debug("Could not read resident models of %s: %r", endpoint.url, e)
+        await asyncio.gather(*(read(endpoint) for endpoint in self.pool.endpoints if endpoint.healthy))
+
+    def active_models(self):
+        now = time.monotonic()
+        for model, used in list(self._active.items()):
+            if now - used > self.active_window:
+                del self._active[model]
+        return set(self.preload) | set(self._active)
+
+    async def _keep_alive_loop(self):
+        while True:
+            try:
+                await self.refresh()
+                for model in self.active_models():
+                    # 상주 중인 호스트에만 유지 신호를 보낸다 (keep_alive 연장; 다른 호스트의 메모리는 건드리지 않는다)
+                    hosts = self.resident_hosts(model)
+                    for endpoint in hosts:
+                        self._load(endpoint.url, model)
+                    if model in self.preload:
+                        self._load_everywhere(model)
+                    elif not hosts:
+                        logger.info("%s is no longer resident on any host, reloading", model)
+                        self.prewarm(model)
+            except Exception as e:
+                logger.warning("Keep-alive round failed: %r", e)
+            await asyncio.sleep(self.interval)
+
+
+_warmer = None
+
+
+def get_model_warmer() -> ModelWarmer:
+    global _warmer
+    if _warmer is None:
+        _warmer = ModelWarmer()
+    return _warmer
@@ -0,0 +1,104 @@
+import logging
+import os
+import re
+
+from utterances import last_by
+
+logger = logging.getLogger("debate.moderator_gate")
+
+# 세션 기본 게이트 (세션별로 moderator_gate 옵션으로 덮어쓸 수 있다; "off"면 매번 LLM 사회자)
+DEFAULT_MODERATOR_GATE = os.environ.get("DEBATE_MODERATOR_GATE", "off")
+
+# 게이트가 판단을 LLM 사회자에게 넘기는 이유
+ROUTINE = "routine"
+REPETITION = "repetition"
+DRIFT = "drift"
+STOP_POINT = "stop_point"
+MAX_SKIPS = "max_skips"
+INCOMPLETE = "incomplete"
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def shingles(text: str, size: int = 3) -> set:
+    """Character n-grams of ``text`` with spaces and punctuation removed.
+
+    Characters rather than words: Korean particles and endings change the
+    word forms of an otherwise repeated sentence.
+    """
+    text = _NON_WORD.sub("", text.lower())
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class LocalModeratorGate:
+    """Decides without an LLM whether a moderator turn is routine.
+
+    ``check`` looks at the latest round of the structured history and
+    returns ``ROUTINE`` when nothing calls for the moderator: no debater
+    repeats itself or the other side (shingle overlap), the debaters still
+    talk about the topic (share of the topic's character bigrams) and the
+    debate isn't long enough to be stopped. Anything else is returned as
+    the reason to escalate to the LLM moderator, which also gets every
+    ``max_skips + 1``-th turn regardless.
+    """
+
+    def __init__(self, repetition_threshold: float = 0.5, drift_threshold: float = 0.15,
+                 stop_after: int = 30, max_skips: int = 2, lookback: int = 3):
+        self.repetition_threshold = repetition_threshold
+        self.drift_threshold = drift_threshold
+        # 사회자 규칙상 종료를 검토할 수 있는 발언 수 (최소 10회 왕복)
+        self.stop_after = stop_after
+        self.max_skips = max_skips
+        # 각 토론자의 이전 발언 중 비교할 개수
+        self.lookback = lookback
+
+    def check(self, state) -> str:
+        history = state["history"]
+        if len(history) >= self.stop_after:
+            return STOP_POINT
+        if state.get("gate_skips", 0) >= self.max_skips:
+            return MAX_SKIPS
+
+        latest = [last_by(state, role) for role in ("debater_A", "debater_B")]
+        if any(utterance is None for utterance in latest):
+            return INCOMPLETE
+        latest_shingles = [shingles(utterance.text) for utterance in latest]
+
+        # 두 토론자가 서로 같은 말을 하거나, 각자 자기 주장을 되풀이하는지
+        if jaccard(*latest_shingles) >= self.repetition_threshold:
+            return REPETITION
+        for utterance, current in zip(latest, latest_shingles):
+            # 라운드마다 세 발언이므로 최근 lookback 라운드만 본다
+            recent = history[-(self.lookback + 1) * 3:]
+            earlier = [u for u in recent if u.role == utterance.role and u is not utterance]
+            if any(jaccard(current, shingles(u.text)) >= self.repetition_threshold for u in earlier):
+                return REPETITION
+
+        # 주제의 글자 bigram이 두 발언 모두에서 거의 보이지 않으면 주제를 벗어난 것으로 본다
+        topic = shingles(state.get("current_topic", ""), size=2)
+        if topic:
+            coverage = [len(topic & shingles(utterance.text, size=2)) / len(topic) for utterance in latest]
+            if max(coverage) < self.drift_threshold:
+                return DRIFT
+        return ROUTINE
+
+
+# 게이트 이름 -> 생성 함수 (세션 설정의 moderator_gate 값)
+MODERATOR_GATES = {
+    "off": lambda: None,
+    "local": LocalModeratorGate
+}
+
+
+def create_gate(name: str):
+    factory = MODERATOR_GATES.get(name or "off")
+    if factory is None:
+        logger.warning("Unknown moderator gate %r, using the LLM moderator for every turn", name)
+        return None
+    return factory()
@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+
+logger = logging.getLogger("debate.ollama_pool")
+
+# 쉼표로 구분한 Ollama 서버 목록 (OLLAMA_HOSTS가 없으면 OLLAMA_BASE_URL 하나만 사용)
+OLLAMA_HOSTS = [
+    url.strip().rstrip("/")
+    for url in (os.environ.get("OLLAMA_HOSTS") or os.environ.get("OLLAMA_BASE_URL", "http://192.168.0.2:11434")).split(",")
+    if url.strip()
+]
+HEALTH_CHECK_INTERVAL = float(os.environ.get("OLLAMA_HEALTH_INTERVAL", 15))
+
+# Errors that mean "this host is unreachable", as opposed to a bad request
+CONNECTION_ERRORS = (ConnectionError, httpx.TransportError)
+
+
+def model_tag(model: str) -> str:
+    """``model`` as /api/tags lists it: names without a tag mean ``:latest``."""
+    # 레지스트리 주소의 포트(host:5000/model)는 태그가 아니다
+    return model if ":" in model.rsplit("/", 1)[-1] else model + ":latest"
+
+
+class OllamaEndpoint:
+    __slots__ = ("url", "healthy", "models", "outstanding", "checked_at", "failures")
+
+    def __init__(self, url: str):
+        self.url = url
+        # 확인 전에는 건강하다고 가정 (모델 목록은 모름)
+        self.healthy = True
+        self.models = None
+        self.outstanding = 0
+        self.checked_at = None
+        self.failures = 0
+
+    def serves(self, model: str) -> bool:
+        return self.models is None or model_tag(model) in self.models
+
+
+class OllamaPool:
+    """Health-checked pool of Ollama hosts with least-outstanding-requests routing.
+
+    Requests for a model go only to healthy hosts that list it in /api/tags.
+    A host that fails a request is marked unhealthy until the next
+    successful health check.
+    """
+
+    def __init__(self, urls=None, check_interval: float = HEALTH_CHECK_INTERVAL, timeout: float = 2.0):
+        self.endpoints = [OllamaEndpoint(url) for url in (urls or OLLAMA_HOSTS)]
+        self.check_interval = check_interval
+        self._client = httpx.AsyncClient(timeout=timeout)
+        self._task = None
+
+    async def check(self, endpoint: OllamaEndpoint):
+        try:
+            response = await self._client.get(f"{endpoint.url}/api/tags")
+            response.raise_for_status()
+            endpoint.models = {model["name"] for model in response.json().get("models", [])}
+            if not endpoint.healthy:
+                logger.info("Ollama host %s is back", endpoint.url)
+            endpoint.healthy = True
+            endpoint.failures = 0
+        except Exception as e:
+            if endpoint.healthy:
+                logger.warning("Ollama host %s failed health check: %r", endpoint.url, e)
+            endpoint.healthy = False
+        endpoint.checked_at = time.monotonic()
+
+    async def check_all(self):
+        await asyncio.gather(*(self.check(endpoint) for endpoint in self.endpoints))
+
+    def start(self):
+        """Start periodic health checks (call check_all first to prime the pool)."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._health_loop())
+
+    async def aclose(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self._client.aclose()
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.check_interval)
+            await self.check_all()
+
+    def models(self):
+        """Models available on at least one healthy host."""
+        names = set()
+        for endpoint in self.endpoints:
+            if endpoint.healthy and endpoint.models:
+                names |= endpoint.models
+        return sorted(names)
+
+    def hosts_for(self, model: str):
+        return [e for e in self.endpoints if e.healthy and e.serves(model)]
+
+    def choose(self, model: str, exclude=()):
+        candidates = [e for e in self.endpoints if e.url not in exclude]
+        if not candidates:
+            return None
+        # 모델이 있는 건강한 호스트 > 건강한 호스트 > 아무 호스트 (전부 죽었으면 복구를 시도)
+        preferred = ([e for e in candidates if e.healthy and e.serves(model)]
+                     or [e for e in candidates if e.healthy]
+                     or candidates)
+        return min(preferred, key=lambda e: (e.outstanding, e.failures))
+
+    def mark_failed(self, endpoint: OllamaEndpoint, error):
+        endpoint.failures += 1
+        if endpoint.healthy:
+            logger.warning("Ollama host %s failed a request, taking it out of rotation: %r", endpoint.url, error)
+        endpoint.healthy = False
+
+    @asynccontextmanager
+    async def lease(self, model: str, exclude=()):
+        endpoint = self.choose(model, exclude)
+        if endpoint is None:
+            raise ConnectionError(f"No Ollama host left to serve {model}")
+        endpoint.outstanding += 1
+        try:
+            yield endpoint
+        finally:
+            endpoint.outstanding -= 1
+
+
+_pool = None
+
+
+def get_ollama_pool() -> OllamaPool:
+    global _pool
+    if _pool is None:
+        _pool = OllamaPool()
+    return _pool
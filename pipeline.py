@@ -0,0 +1,75 @@
+import asyncio
+import logging
+import os
+
+from utils import spawn_detached
+
+logger = logging.getLogger("debate.pipeline")
+
+# 파이프라인 모드 기본값 (세션별로 pipelined 옵션으로 덮어쓸 수 있다)
+DEFAULT_PIPELINED = os.environ.get("DEBATE_PIPELINED", "0") == "1"
+
+# 노드 다음에 실행되는 노드 (그래프 순서: moderator -> debater_A -> debater_B -> moderator)
+NEXT_NODE = {
+    "moderator": "debater_A",
+    "debater_A": "debater_B",
+    "debater_B": "moderator"
+}
+
+
+class Pipeline:
+    """Speculative work for the next node, started as soon as a node's utterance is known.
+
+    ``precheck`` reviews the proponent's utterance for the moderator while
+    the opponent is still speaking; ``warm`` sends the next node's prompt
+    prefix (see ``prompts.build_messages``) ahead so the model's prompt
+    cache is filled before the real request arrives. Neither ever delays a
+    node: a pre-check that hasn't finished by the time the moderator needs
+    it is dropped.
+    """
+
+    def __init__(self, precheck, warm):
+        self._precheck = precheck
+        self._warm = warm
+        # thread_id -> (index of the checked message, task)
+        self._prechecks = {}
+        # thread_id -> task
+        self._warmups = {}
+
+    def start_precheck(self, thread_id, index: int, view, config):
+        previous = self._prechecks.pop(thread_id, None)
+        if previous:
+            previous[1].cancel()
+        task = spawn_detached(self._precheck(view, config))
+        self._prechecks[thread_id] = (index, task)
+
+    def take_precheck(self, thread_id, index: int):
+        """Return the finished pre-check of message ``index``, or None (never blocks)."""
+        pending = self._prechecks.pop(thread_id, None)
+        if not pending:
+            return None
+        checked, task = pending
+        if checked != index or not task.done():
+            task.cancel()
+            return None
+        if task.cancelled() or task.exception() is not None:
+            logger.debug("Pre-check failed for %s: %r", thread_id, None if task.cancelled() else task.exception())
+            return None
+        return task.result()
+
+    def warm(self, thread_id, prefix, config, node: str):
+        previous = self._warmups.pop(thread_id, None)
+        if previous:
+            # 이전 턴의 예열은 이미 쓸모없다
+            previous.cancel()
+        task = spawn_detached(self._run_warm(prefix, config, node))
+        self._warmups[thread_id] = task
+        task.add_done_callback(lambda t: self._warmups.pop(thread_id, None) if self._warmups.get(thread_id) is t else None)
+
+    async def _run_warm(self, prefix, config, node):
+        try:
+            await self._warm(prefix, config, node)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.debug("Prompt warm-up for %s failed: %r", node, e)
@@ -0,0 +1,100 @@
+from langchain_core.messages import HumanMessage, SystemMessage
+
+# 프롬프트 배치: [공통 시스템 메시지] [요약] [발언 기록 ...] [이번 차례 지시]
+# 마지막 메시지만 역할/턴마다 달라지고, 그 앞부분은 세 역할이 공유하며 요약이 접힐 때까지
+# 뒤에 덧붙기만 한다. 그래서 Ollama KV 캐시와 Gemini 컨텍스트 캐시가 앞부분을 재사용할 수 있다.
+
+DEBATE_SYSTEM = """다음은 사회자, 찬성, 반대 세 참가자가 진행하는 토론입니다.
+주제: {topic}
+
+토론 기록의 각 메시지는 "이름: 발언" 형식입니다.
+마지막 메시지에서 지정하는 역할로 다음 발언 하나만 작성하고, 이름 표시 없이 발언 내용만 쓰세요."""
+
+SUMMARY_HEADER = "[이전 토론 요약]\n"
+
+# 사회자 첫 발언
+MODERATOR_OPENING = """당신은 전문 토론 사회자입니다.
+
+다음 규칙을 엄격히 지키세요:
+1. 양측의 입장을 명확히 하고, 토론의 쟁점을 제시하세요.
+2. 토론이 활발하게 이루어질 수 있도록 흥미로운 소주제를 던지세요.
+3. 첫 발언이므로 토론자들에게 발언 기회를 넘기세요.
+4. 절대 토론을 바로 종료하지 마세요.
+
+출력 형식:
+[사회자 발언 내용]
+Decision: continue
+"""
+
+MODERATOR_TURN = """당신은 전문 토론 사회자입니다.
+
+다음 규칙을 엄격히 지키세요:
+1. 주제에서 벗어난 발언이 있으면 즉시 중단하고 주제로 돌아가도록 지시하세요.
+2. 동일한 주장의 반복이 너무 많이 발생하면 새로운 관점을 제시하거나 다음 쟁점으로 넘어가세요.
+3. 건전한 토론 환경을 유지하기 위해 공격적인 발언 시 경고하세요.
+4. 토론이 원활히 진행되지 않는다면 주제에서의 소주제를 제시하여 토론을 이어가도록 유도하세요.
+5. 토론이 충분히 무르익었거나(최소 10회 이상 왕복), 더 이상 새로운 논점이 나오지 않을 때만 종료를 선언하세요.
+6. 그 전까지는 토론을 계속 진행시키세요.
+
+다음 발언 전에 다음 중 하나의 판단을 내려야 합니다. 반드시 마지막 줄에 Decision: [continue/instruction/stop] 형식을 포함하세요.
+- 계속 진행 (특별한 개입 필요 없음): 'continue'
+- 의사 진행 발언 (개입 필요): 'instruction'
+- 토론 종료: 'stop'
+
+출력 예시:
+[사회자 발언 또는 평가 내용]
+Decision: continue
+"""
+
+DEBATER_TURN = """당신은 {name} 입장의 토론자입니다.
+
+다음 지침을 따라 토론에 참여하세요:
+1. 상대방의 논리를 날카롭게 분석하고 반박하세요.
+2. 자신의 주장을 뒷받침할 구체적인 근거와 예시를 제시하세요.
+3. 상대방의 의견 중 타당한 부분은 인정하되, 핵심 쟁점에서는 물러서지 마세요.
+4. 감정적인 대응보다는 논리적인 설득을 우선시하세요.
+5. 사회자의 지시가 있다면 이를 충실히 따르세요.
+6. 상대방을 존중하는 태도를 유지하세요.
+
+사회자의 지시사항:
+{moderator_instruction}
+
+당신의 차례입니다. 간결하고 강력하게 발언하세요:"""
+
+# 로컬 게이트가 평범한 턴으로 판단해 LLM 사회자를 건너뛸 때의 사회자 발언
+MODERATOR_CONTINUE = "좋습니다. 지금의 쟁점으로 계속 토론을 이어가 주세요."
+
+# 사회자 판단을 위한 사전 검토 (파이프라인 모드)
+PRECHECK_TURN = """당신은 토론 사회자의 보조입니다.
+
+위 기록의 마지막 발언만 다음 기준으로 점검하세요.
+1. 주제에서 벗어났는가?
+2. 이전 발언과 같은 주장을 반복하는가?
+3. 공격적인 표현이 있는가?
+
+문제가 없으면 "문제 없음"이라고만 쓰고, 문제가 있으면 한 문장으로 지적하세요."""
+
+PRECHECK_OK = "문제 없음"
+
+
+def build_messages(topic: str, summary: str, recent, turn: str):
+    """Chat messages for one LLM call.
+
+    Only the last message (``turn``) is specific to the role and turn;
+    everything before it is the same for every role and only grows between
+    summary folds.
+    """
+    messages = [SystemMessage(DEBATE_SYSTEM.format(topic=topic))]
+    if summary:
+        messages.append(HumanMessage(SUMMARY_HEADER + summary))
+    # 발언 기록은 여기서 처음으로 "이름: 발언" 문자열이 된다
+    messages.extend(HumanMessage(utterance.render()) for utterance in recent)
+    messages.append(HumanMessage(turn))
+    return messages
+
+
+def prompt_text(messages) -> str:
+    """Plain text of a prompt (for token estimates and logs)."""
+    if isinstance(messages, str):
+        return messages
+    return "\n".join(message.content for message in messages)
@@ -0,0 +1,198 @@
+"""Content-addressed cache of LLM completions for replayed debates.
+
+Set ``DEBATE_RESPONSE_CACHE`` to a SQLite file to enable it. A completion
+is stored under a hash of everything that determines it (provider, model,
+temperature and the exact prompt messages); when the same prompt comes
+again the stored text is streamed back by ``ReplayChatModel`` instead of
+calling the model, so repeated topics, demos and benchmark runs use no GPU
+time. Warm-up calls and other requests with extra generation options are
+never cached.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+logger = logging.getLogger("debate.response_cache")
+
+# 캐시 파일 경로 (없으면 캐시를 쓰지 않는다)
+RESPONSE_CACHE_PATH = os.environ.get("DEBATE_RESPONSE_CACHE")
+RESPONSE_CACHE_MAX_MB = int(os.environ.get("DEBATE_RESPONSE_CACHE_MB", 256))
+# 캐시된 응답을 재생하는 속도 (초당 토큰, 0이면 한 번에)
+REPLAY_TOKENS_PER_SEC = float(os.environ.get("DEBATE_REPLAY_TPS", 40))
+# 용량을 넘으면 이 비율까지 오래된 항목을 지운다
+EVICT_TO = 0.9
+# 캐시 적중의 last_used 갱신은 모아 두었다가 이만큼 쌓이면 (또는 다음 put에서) 한 번에 쓴다
+TOUCH_BATCH = 64
+# 다른 프로세스의 쓰기를 기다리는 시간 (초)
+DB_BUSY_TIMEOUT = 5
+
+_TOKEN = re.compile(r"\s*\S+")
+
+
+class ReplayChatModel(BaseChatModel):
+    """Chat model that streams a fixed text, word by word, at ``tokens_per_sec``."""
+
+    text: str
+    tokens_per_sec: float = REPLAY_TOKENS_PER_SEC
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def _pieces(self):
+        pieces = _TOKEN.findall(self.text)
+        tail = self.text[sum(len(piece) for piece in pieces):]
+        if tail:
+            pieces.append(tail)
+        return pieces
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.text))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        interval = 1 / self.tokens_per_sec if self.tokens_per_sec > 0 else 0
+        for piece in self._pieces():
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=piece))
+            if run_manager:
+                run_manager.on_llm_new_token(piece, chunk=chunk)
+            yield chunk
+            if interval:
+                time.sleep(interval)
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+                       **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        interval = 1 / self.tokens_per_sec if self.tokens_per_sec > 0 else 0
+        for piece in self._pieces():
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=piece))
+            if run_manager:
+                await run_manager.on_llm_new_token(piece, chunk=chunk)
+            yield chunk
+            if interval:
+                await asyncio.sleep(interval)
+
+
+class ResponseCache:
+    """Completions in one SQLite file, evicted least recently used first.
+
+    The file can be shared by server workers and batch processes, so every
+    query runs in a worker thread: waiting for another process's write must
+    not stall the streams of this one. A hit only reads; its ``last_used``
+    is written later together with other hits. Sizes are counted in bytes
+    of stored text; once the total passes ``max_bytes`` the oldest entries
+    are deleted down to ``EVICT_TO`` of it.
+    """
+
+    def __init__(self, path: str, max_bytes: int = RESPONSE_CACHE_MAX_MB * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._db = sqlite3.connect(path, timeout=DB_BUSY_TIMEOUT, check_same_thread=False)
+        self._lock = threading.Lock()
+        # key -> time of its last hit, not yet written
+        self._touched = {}
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, provider TEXT, model TEXT, text TEXT NOT NULL, "
+            "size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self._db.commit()
+        self._size = self._total_size()
+
+    @staticmethod
+    def key(provider: str, model: str, temperature, prompt) -> str:
+        if isinstance(prompt, str):
+            messages = prompt
+        else:
+            messages = [[message.type, message.content] for message in prompt]
+        payload = json.dumps([provider, model, temperature, messages], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[str]:
+        text = await asyncio.to_thread(self._locked, self._read, key)
+        if text is not None:
+            self._touched[key] = time.time()
+            if len(self._touched) >= TOUCH_BATCH:
+                touched, self._touched = self._touched, {}
+                await asyncio.to_thread(self._locked, self._write_touched, touched)
+        return text
+
+    async def put(self, key: str, provider: str, model: str, text: str):
+        if not text:
+            return
+        touched, self._touched = self._touched, {}
+        await asyncio.to_thread(self._locked, self._write, key, provider, model, text, touched)
+
+    def _locked(self, query, *args):
+        # sqlite3 연결은 한 번에 한 스레드만 쓴다
+        with self._lock:
+            return query(*args)
+
+    def _read(self, key):
+        row = self._db.execute("SELECT text FROM responses WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _write_touched(self, touched):
+        with self._db:
+            self._db.executemany("UPDATE responses SET last_used = ? WHERE key = ?",
+                                 [(used, key) for key, used in touched.items()])
+
+    def _write(self, key, provider, model, text, touched):
+        size = len(text.encode("utf-8"))
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, provider, model, text, size, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, provider, model, text, size, time.time())
+            )
+            if touched:
+                self._db.executemany("UPDATE responses SET last_used = ? WHERE key = ?",
+                                     [(used, key) for key, used in touched.items()])
+        self._size += size
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        # 다른 프로세스도 쓰므로 실제 크기를 다시 센다
+        self._size = self._total_size()
+        target = int(self.max_bytes * EVICT_TO)
+        removed = 0
+        with self._db:
+            rows = self._db.execute("SELECT key, size FROM responses ORDER BY last_used").fetchall()
+            for key, size in rows:
+                if self._size <= target:
+                    break
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._size -= size
+                removed += 1
+        if removed:
+            logger.info("Response cache: evicted %d entries (%.1f MB left)", removed, self._size / 1024 / 1024)
+
+    def _total_size(self) -> int:
+        return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+
+_cache = None
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """The process-wide response cache, or None when DEBATE_RESPONSE_CACHE is unset."""
+    global _cache
+    if _cache is None and RESPONSE_CACHE_PATH:
+        _cache = ResponseCache(RESPONSE_CACHE_PATH)
+    return _cache
@@ -1,13 +1,50 @@
 import asyncio
-import json
+import logging
+import os
 import subprocess
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
-from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from debate_graph import create_debate_app
+from debate_graph import get_shared_debate_app, session_config
+from pipeline import DEFAULT_PIPELINED
+from moderator_gate import DEFAULT_MODERATOR_GATE
+from session_store import SessionStore
+from model_catalog import ModelCatalog
+from ollama_pool import get_ollama_pool
+from llm_registry import preload_providers
+from model_warmer import get_model_warmer, PREWARM_ON_START
+from logging_setup import configure_logging, TokenLogSampler
+from sse import (TokenCoalescer, iterate_with_ticks, watch_disconnect, sse_event,
+                 DEFAULT_FLUSH_INTERVAL_MS, DEFAULT_FLUSH_BYTES)
+from event_dispatch import TurnDispatcher, EVENT_FILTERS, DEFAULT_SHOW_REASONING
+from metrics import render_metrics, ADMISSION
+from admission import get_admission_controller, AdmissionRejected, MAX_QUEUE_WAIT
 
-app = FastAPI()
+configure_logging()
+logger = logging.getLogger("debate.server")
+
+ollama_pool = get_ollama_pool()
+model_catalog = ModelCatalog(ollama_pool)
+model_warmer = get_model_warmer()
+admission = get_admission_controller()
+
+@asynccontextmanager
+async def lifespan(app):
+    # Prime the pool (and with it the model list) so the first page load doesn't wait on Ollama
+    await model_catalog.refresh()
+    ollama_pool.start()
+    # 설정된 모델을 미리 올리고, 사용 중인 모델은 내려가지 않게 유지한다 (백그라운드)
+    model_warmer.start()
+    # 프로바이더 SDK는 첫 요청 전에 별도 스레드에서 불러 둔다 (워커 기동을 늦추지 않게)
+    asyncio.get_running_loop().run_in_executor(None, preload_providers)
+    yield
+    model_catalog.close()
+    await model_warmer.aclose()
+    await ollama_pool.aclose()
+
+app = FastAPI(lifespan=lifespan)
 
 app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="static")
@@ -16,40 +53,27 @@ templates = Jinja2Templates(directory="static")
 async def get_home(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
-import requests
-
 @app.get("/models")
 async def get_models():
-    models = []
-    
-    # Get Ollama models
-    try:
-        response = requests.get('http://192.168.0.2:11434/api/tags', timeout=2)
-        if response.status_code == 200:
-            data = response.json()
-            for model in data.get('models', []):
-                models.append({"name": model['name'], "provider": "ollama"})
-    except Exception as e:
-        print(f"Error listing Ollama models: {e}")
-
-    # Add Gemini models
-    gemini_models = [
-        "gemini-3-pro",
-        "gemini-2.5-pro",
-        "gemini-2.5-flash",
-        "gemini-2.0-flash",
-        "gemini-1.5-pro",
-        "gemini-1.5-flash"
-    ]
-    for m in gemini_models:
-        models.append({"name": m, "provider": "google"})
-
-    return JSONResponse(content={"models": models})
+    return JSONResponse(content={"models": model_catalog.get()})
+
+@app.get("/metrics")
+async def get_metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
 
 import uuid
 
-# Store active debate sessions
-sessions = {}
+# Store active debate sessions (bounded; set DEBATE_SESSION_DB to page idle sessions out to disk)
+session_store = SessionStore(
+    max_sessions=int(os.environ.get("DEBATE_MAX_SESSIONS", 200)),
+    ttl_seconds=float(os.environ.get("DEBATE_SESSION_TTL", 6 * 3600)),
+    memory_budget_bytes=int(os.environ.get("DEBATE_MEMORY_BUDGET_MB", 512)) * 1024 * 1024,
+    db_path=os.environ.get("DEBATE_SESSION_DB")
+)
+
+def get_debate_app():
+    return get_shared_debate_app(session_store.checkpointer())
 
 @app.post("/start_debate")
 async def start_debate_endpoint(request: Request):
@@ -58,173 +82,270 @@ async def start_debate_endpoint(request: Request):
     model = data.get("model", "qwq")
     provider = data.get("provider", "ollama")
     google_api_key = data.get("google_api_key")
+    # SSE 토큰 묶음 전송 설정 (0이면 토큰마다 바로 전송)
+    flush_interval_ms = int(data.get("flush_interval_ms", DEFAULT_FLUSH_INTERVAL_MS))
+    flush_bytes = int(data.get("flush_bytes", DEFAULT_FLUSH_BYTES))
+    # 다음 노드 준비를 현재 노드 생성과 겹쳐서 실행 (병렬 요청을 받을 수 있는 서버에서 유리)
+    pipelined = bool(data.get("pipelined", DEFAULT_PIPELINED))
+    # 모델의 추론(<think>) 토큰도 "reasoning" 이벤트로 보낼지
+    show_reasoning = bool(data.get("show_reasoning", DEFAULT_SHOW_REASONING))
+    # 평범한 턴에는 LLM 사회자를 건너뛰는 로컬 게이트 ("off" / "local")
+    moderator_gate = data.get("moderator_gate", DEFAULT_MODERATOR_GATE)
     
-    print(f"Starting debate session with topic: {topic}, model: {model}, provider: {provider}")
-    
-    # Create a new app instance
-    debate_app = create_debate_app(model, provider, google_api_key)
+    logger.info("Starting debate session with topic: %s, model: %s, provider: %s", topic, model, provider)
+
+    # 모델이 이미 한도까지 차 있으면 세션을 만들기 전에 돌려보낸다
+    try:
+        admission.check_capacity(provider, model)
+    except AdmissionRejected as e:
+        logger.warning("Rejecting new debate: %s", e)
+        return busy_response(e)
     
+    # 첫 턴을 요청하기 전에 모델 로드를 시작한다 (콜드 로드 대기를 첫 사회자 발언에서 숨긴다)
+    if provider == "ollama" and bool(data.get("prewarm", PREWARM_ON_START)):
+        model_warmer.prewarm(model)
+
     # Generate session ID
     session_id = str(uuid.uuid4())
     
-    # Store session
-    sessions[session_id] = {
-        "app": debate_app,
-        "topic": topic,
-        "turn_count": 0
-    }
+    # Store session (the graph and LLM clients are shared; only the config is per session)
+    await session_store.create(
+        session_id,
+        topic=topic,
+        model=model,
+        provider=provider,
+        api_key=google_api_key,
+        flush_interval_ms=flush_interval_ms,
+        flush_bytes=flush_bytes,
+        pipelined=pipelined,
+        show_reasoning=show_reasoning,
+        moderator_gate=moderator_gate
+    )
     
     return JSONResponse(content={"session_id": session_id})
 
+# /stream_debate 기본 턴 간격 (0이면 다음 턴을 바로 시작)
+DEFAULT_STREAM_PACE_MS = int(os.environ.get("DEBATE_STREAM_PACE_MS", 0))
+# 대기열에 있는 턴이 순번과 연결 끊김을 확인하는 주기 (초)
+ADMISSION_POLL_INTERVAL = 1.0
+
+# /start_debate는 503과 Retry-After로 알린다
+def busy_response(e: AdmissionRejected):
+    return JSONResponse(content={"error": "Server busy", "retry_after": e.retry_after}, status_code=503,
+                        headers={"Retry-After": str(e.retry_after)})
+
 @app.get("/next_turn")
-async def next_turn(session_id: str):
-    if session_id not in sessions:
+async def next_turn(session_id: str, request: Request):
+    """Run one graph step (a single utterance) and stream it."""
+    session = await session_store.get(session_id)
+    if session is None:
         return JSONResponse(content={"error": "Session not found"}, status_code=404)
-    
-    session = sessions[session_id]
-    debate_app = session["app"]
+    return StreamingResponse(stream_turns(session_id, session, request, max_turns=1),
+                             media_type="text/event-stream")
+
+@app.get("/stream_debate")
+async def stream_debate(session_id: str, request: Request, turns: int = 0, pace_ms: int = None):
+    """Run ``turns`` graph steps (0 = until the debate ends) over one SSE connection.
+
+    ``pace_ms`` waits between utterances on the server, so the client doesn't
+    need to reconnect (or time anything) to advance the debate.
+    """
+    session = await session_store.get(session_id)
+    if session is None:
+        return JSONResponse(content={"error": "Session not found"}, status_code=404)
+    pace = (DEFAULT_STREAM_PACE_MS if pace_ms is None else pace_ms) / 1000
+    return StreamingResponse(stream_turns(session_id, session, request, max_turns=turns, pace=pace),
+                             media_type="text/event-stream")
+
+async def wait_for_turn(ticket, disconnected):
+    """SSE "waiting" events while ``ticket`` is queued; raises ``AdmissionRejected`` after MAX_QUEUE_WAIT."""
+    position = None
+    while not ticket.admitted and not disconnected.is_set():
+        if ticket.position != position:
+            position = ticket.position
+            yield sse_event({'type': 'waiting', 'position': position})
+        if ticket.waited >= MAX_QUEUE_WAIT:
+            gate = ticket.gate
+            ADMISSION.inc(gate.provider, gate.model, "timed_out")
+            raise AdmissionRejected(gate.model, gate.retry_after())
+        await ticket.wait(min(ADMISSION_POLL_INTERVAL, MAX_QUEUE_WAIT - ticket.waited))
+    if ticket.admitted and position is not None:
+        # 차례가 왔다 (position 0)
+        yield sse_event({'type': 'waiting', 'position': 0})
+
+async def stream_turns(session_id, session, request, max_turns=1, pace=0.0):
+    debate_app = get_debate_app()
     topic = session["topic"]
-    
-    async def event_generator():
-        # Configuration for the thread
-        config = {"configurable": {"thread_id": session_id}, "recursion_limit": 150}
-        
-        inputs = None
-        if session["turn_count"] == 0:
-            print(f"Session {session_id}: First turn, providing inputs.")
-            inputs = {
-                "history": [],
-                "current_topic": topic
-            }
-        else:
-            print(f"Session {session_id}: Resuming turn {session['turn_count']}.")
-        
-        try:
-            # Use astream_events
-            # If inputs is None, it resumes from interrupt
-            event_count = 0
-            async for event in debate_app.astream_events(inputs, version="v2", config=config):
-                event_count += 1
-                kind = event["event"]
-                
-                # Log ALL events for debugging
-                if event_count <= 10 or kind in ["on_chat_model_stream", "on_chain_stream"]:
-                    print(f"[DEBUG] Event #{event_count}: {kind}")
-                
-                # Stream tokens - handle both event types for cross-platform compatibility
-                if kind == "on_chat_model_stream":
-                    # Windows/direct streaming approach
-                    content = event["data"]["chunk"].content
-                    print(f"[DEBUG] Token content (chat_model): {repr(content)}")
-                    if content:
-                        # Determine role from node name
-                        node_name = event.get("metadata", {}).get("langgraph_node", "")
-                        role = "unknown"
-                        if node_name == "moderator":
-                            role = "moderator"
-                        elif node_name == "debater_A":
-                            role = "proponent"
-                        elif node_name == "debater_B":
-                            role = "opponent"
-                        
-                        if role != "unknown":
-                            data = json.dumps({
-                                "type": "token",
-                                "role": role,
-                                "content": content
-                            })
-                            print(f"[DEBUG] Emitting token for {role}: {content[:20]}...")
-                            yield f"data: {data}\n\n"
-                        else:
-                            print(f"[DEBUG] Token skipped - unknown role for node: {node_name}")
-                
-                elif kind == "on_chain_stream":
-                    # RPi/alternative streaming approach
-                    chunk = event["data"].get("chunk")
-                    node_name = event.get("metadata", {}).get("langgraph_node", "")
-                    
-                    print(f"[DEBUG] on_chain_stream - node: {node_name}, chunk type: {type(chunk)}")
-                    
-                    if chunk and node_name in ["moderator", "debater_A", "debater_B"]:
-                        # Try different ways to get content
-                        content = None
-                        
-                        # RPi approach: Look for history in the chunk
-                        if isinstance(chunk, dict) and 'history' in chunk:
-                            history = chunk['history']
-                            if history and len(history) > 0:
-                                # Get the last message in history
-                                last_message = history[-1]
-                                print(f"[DEBUG] Found history with {len(history)} messages, last: {last_message[:100]}...")
-                                
-                                # Extract just the text part (remove role prefix if present)
-                                # Format is usually "사회자: text" or "찬성: text"
-                                if isinstance(last_message, str):
-                                    # Remove role prefix if it exists
-                                    parts = last_message.split(': ', 1)
-                                    if len(parts) > 1:
-                                        content = parts[1]
-                                    else:
-                                        content = last_message
-                                    print(f"[DEBUG] Extracted content: {content[:100]}...")
-                        
-                        # Windows approach: Direct content attribute
-                        elif hasattr(chunk, 'content'):
-                            content = chunk.content
-                            print(f"[DEBUG] Found content via .content: {repr(content)}")
-                        
-                        if content:
-                            role = "unknown"
-                            if node_name == "moderator":
-                                role = "moderator"
-                            elif node_name == "debater_A":
-                                role = "proponent"
-                            elif node_name == "debater_B":
-                                role = "opponent"
-                            
-                            if role != "unknown":
-                                # Send the complete text as a single token
-                                data = json.dumps({
-                                    "type": "token",
-                                    "role": role,
-                                    "content": content
-                                })
-                                print(f"[DEBUG] Emitting full text for {role} ({len(content)} chars)")
-                                yield f"data: {data}\n\n"
-
-                # Handle decision/stop (check state updates)
-                elif kind == "on_chain_end":
-                    node_name = event.get("metadata", {}).get("langgraph_node")
-                    
-                    if node_name in ["moderator", "debater_A", "debater_B"]:
-                        # Emit turn_end event
-                        print(f"[DEBUG] Emitting turn_end for {node_name}")
-                        yield f"data: {json.dumps({'type': 'turn_end', 'role': node_name})}\n\n"
-
-                    if node_name == "moderator":
-                        # Check if moderator decided to stop
-                        output = event["data"].get("output")
-                        if output and isinstance(output, dict) and output.get("decision") == "stop":
-                            print(f"[DEBUG] Emitting end event")
-                            yield f"data: {json.dumps({'type': 'end'})}\n\n"
-            
-            print(f"[DEBUG] Total events processed: {event_count}")
-            # Increment turn count after successful stream
-            session["turn_count"] += 1
-            print(f"[DEBUG] Turn {session['turn_count']} completed")
-
-        except Exception as e:
-            print(f"Error in stream: {e}")
-            import traceback
-            traceback.print_exc()
-            yield f"data: {json.dumps({'type': 'error', 'content': str(e)})}\n\n"
-        
-        # Signal that this turn's stream is done (client should close)
-        print(f"[DEBUG] Emitting stream_end")
-        yield f"data: {json.dumps({'type': 'stream_end'})}\n\n"
-
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
+
+    # Configuration for the thread
+    config = session_config(session_id, session["model"], session["provider"], session.get("api_key"),
+                            pipelined=session.get("pipelined"), moderator_gate=session.get("moderator_gate"))
+
+    # DEBUG 여부는 스트림마다 한 번만 확인 (꺼져 있으면 이벤트당 비용 없음)
+    debug = logger.isEnabledFor(logging.DEBUG)
+    sample_event = TokenLogSampler()
+    coalescer = TokenCoalescer(
+        session.get("flush_interval_ms", DEFAULT_FLUSH_INTERVAL_MS) / 1000,
+        session.get("flush_bytes", DEFAULT_FLUSH_BYTES)
+    )
+
+    def account(node_name, output):
+        if isinstance(output, dict) and output.get("history"):
+            session_store.account(session_id, sum(len(u.text) for u in output["history"]))
+
+    partial = session.pop("partial_turn", None)
+    if partial:
+        # 지난 턴은 클라이언트가 끊겨 중단되었다: 마지막 체크포인트에서 그 발언을 다시 생성한다
+        logger.info("Session %s: regenerating interrupted %s turn.", session_id, partial["role"])
+        yield sse_event({"type": "regenerate", **partial})
+
+    def abandon_turn(dispatcher, event_count):
+        # 노드가 끝나지 않았으므로 체크포인트는 이전 턴 그대로다. 받은 부분만 기록해 둔다
+        # (아무것도 받기 전에 끊겼다면 앞서 중단된 발언 기록을 그대로 둔다)
+        current = dispatcher.partial() or partial
+        if current:
+            session["partial_turn"] = current
+        session_store.save_soon(session_id)
+        logger.info("Session %s: client disconnected, turn %d cancelled after %d events.",
+                    session_id, session["turn_count"] + 1, event_count)
+
+    def keep_partial():
+        # 이번 턴은 시작하지 않았다: 중단된 발언 기록은 다음 요청을 위해 남겨 둔다
+        if partial:
+            session["partial_turn"] = partial
+            session_store.save_soon(session_id)
+
+    # 스트림(/next_turn, /stream_debate)은 EventSource가 상태 코드를 읽을 수 없으므로 busy 이벤트로 알린다
+    def shed_turn(e):
+        keep_partial()
+        logger.info("Session %s: turn %d not admitted: %s", session_id, session["turn_count"] + 1, e)
+        return coalescer.flush() + sse_event({'type': 'busy', 'retry_after': e.retry_after})
+
+    # 모델별 동시 생성 턴 수 제한 (넘으면 대기열, 대기열도 차면 busy)
+    gate = admission.gate(session["provider"], session["model"])
+
+    # 브라우저가 연결을 끊으면 그래프 실행과 LLM 요청을 바로 취소한다
+    disconnected = asyncio.Event()
+    watcher = asyncio.create_task(watch_disconnect(request, disconnected))
+    turns = 0
+    try:
+        while True:
+            if session["provider"] == "ollama":
+                # 토론이 이어지는 동안 모델이 내려가지 않게 한다
+                model_warmer.touch(session["model"])
+            try:
+                ticket = gate.enter()
+            except AdmissionRejected as e:
+                yield shed_turn(e)
+                break
+            try:
+                try:
+                    async for frame in wait_for_turn(ticket, disconnected):
+                        yield frame
+                except AdmissionRejected as e:
+                    yield shed_turn(e)
+                    break
+                except asyncio.CancelledError:
+                    keep_partial()
+                    raise
+                if not ticket.admitted:
+                    # 대기열에서 기다리다 연결이 끊겼다
+                    keep_partial()
+                    return
+
+                dispatcher = TurnDispatcher(coalescer, on_node_end=account,
+                                            show_reasoning=session.get("show_reasoning", DEFAULT_SHOW_REASONING))
+                inputs = None
+                if session["turn_count"] == 0:
+                    logger.info("Session %s: First turn, providing inputs.", session_id)
+                    inputs = {
+                        "history": [],
+                        "current_topic": topic
+                    }
+                else:
+                    logger.info("Session %s: Resuming turn %d.", session_id, session["turn_count"])
+
+                # If inputs is None, it resumes from interrupt
+                event_count = 0
+                try:
+                    events = debate_app.astream_events(inputs, version="v2", config=config, **EVENT_FILTERS)
+                    async for event in iterate_with_ticks(events, coalescer.time_to_flush, stop=disconnected):
+                        if event is None:
+                            # Flush interval elapsed with tokens still buffered
+                            yield coalescer.flush()
+                            continue
+
+                        event_count += 1
+                        if debug and sample_event():
+                            logger.debug("Event #%d: %s (%s)", event_count, event["event"], event["name"])
+
+                        frames = dispatcher.dispatch(event)
+                        if frames:
+                            yield frames
+                except asyncio.CancelledError:
+                    # Starlette가 연결 끊김을 먼저 알아채면 이 제너레이터를 취소한다
+                    abandon_turn(dispatcher, event_count)
+                    raise
+
+                if disconnected.is_set():
+                    abandon_turn(dispatcher, event_count)
+                    return
+
+                # Increment turn count after successful stream
+                partial = None
+                await session_store.advance_turn(session_id)
+                if dispatcher.ended:
+                    logger.info("Session %s: moderator ended the debate.", session_id)
+                logger.info("Session %s: turn %d completed (%d events)", session_id, session["turn_count"], event_count)
+
+                turns += 1
+                # 그래프가 이미 끝났으면 (실행된 노드 없음) 더 진행할 것이 없다
+                if dispatcher.ended or event_count == 0 or (max_turns and turns >= max_turns):
+                    break
+            finally:
+                ticket.release()
+
+            if pace > 0:
+                # 다음 발언까지 쉬는 동안에도 연결 끊김은 바로 알아챈다
+                try:
+                    await asyncio.wait_for(disconnected.wait(), pace)
+                    return
+                except asyncio.TimeoutError:
+                    pass
+
+    except Exception as e:
+        logger.exception("Error in stream for session %s", session_id)
+        yield coalescer.flush() + sse_event({'type': 'error', 'content': str(e)})
+    finally:
+        watcher.cancel()
+
+    # Signal that this stream is done (client should close)
+    yield coalescer.flush() + sse_event({'type': 'stream_end'})
 
 if __name__ == "__main__":
+    import argparse
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+
+    parser = argparse.ArgumentParser(description="Debate server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes; sessions and checkpoints are shared through DEBATE_SESSION_DB")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="report the import time of the server and each provider, then exit")
+    args = parser.parse_args()
+
+    if args.profile_startup:
+        import sys
+        from startup_profile import profile_startup
+        sys.exit(0 if profile_startup("server") else 1)
+
+    if args.workers > 1:
+        # 워커끼리 세션을 공유하려면 디스크 저장소가 필요하다 (워커는 이 환경 변수를 물려받는다)
+        if not os.environ.get("DEBATE_SESSION_DB"):
+            os.environ["DEBATE_SESSION_DB"] = "debate_sessions.db"
+            logger.info("Sharing sessions between %d workers through %s", args.workers,
+                        os.environ["DEBATE_SESSION_DB"])
+        uvicorn.run("server:app", host=args.host, port=args.port, workers=args.workers)
+    else:
+        uvicorn.run(app, host=args.host, port=args.port)
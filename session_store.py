@@ -0,0 +1,225 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from langgraph.checkpoint.memory import MemorySaver
+
+from utterances import checkpoint_serde
+
+logger = logging.getLogger("debate.sessions")
+
+# 세션 메타데이터 중 디스크에 저장하는 필드
+# (api_key는 디스크에 남기지 않는다; 디스크에서 복원된 Google 세션은 GOOGLE_API_KEY를 사용)
+PERSISTED_FIELDS = ("topic", "model", "provider", "turn_count", "flush_interval_ms", "flush_bytes", "pipelined",
+                    "show_reasoning", "partial_turn", "moderator_gate")
+
+
+# 여러 워커 프로세스가 같은 DB 파일을 쓸 때 잠금을 기다리는 시간 (초)
+DB_BUSY_TIMEOUT = 30
+# 세션 메타데이터 쿼리가 잠금을 기다리는 시간 (초; 체크포인터의 트랜잭션은 보통 금방 끝난다)
+METADATA_BUSY_TIMEOUT = 5
+
+
+class SessionStore:
+    """Bounded store for debate sessions with LRU/TTL eviction.
+
+    All sessions share one checkpointer. Without ``db_path`` the checkpoints
+    live in memory and an evicted session is gone for good. With ``db_path``
+    both the checkpoints (SQLite checkpointer) and the session metadata are
+    kept on disk, so eviction only pages a session out of memory and ``get``
+    brings it back on the next request.
+
+    The database is also what lets several server workers share debates:
+    ``get`` always reads the metadata from disk, so a session advanced by
+    another worker is seen as it is, and ``advance_turn`` increments
+    ``turn_count`` in a single statement. Metadata queries run in a worker
+    thread: the checkpointer keeps a write transaction open across awaits,
+    and a query waiting for that lock must not block the event loop the
+    commit needs to run on.
+    """
+
+    def __init__(self, max_sessions: int = 200, ttl_seconds: float = 6 * 3600,
+                 memory_budget_bytes: int = 512 * 1024 * 1024, db_path: str = None):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.memory_budget_bytes = memory_budget_bytes
+        self.db_path = db_path
+        # session_id -> session dict, least recently used first
+        self._sessions = OrderedDict()
+        self._memory_bytes = 0
+        self._checkpointer = None
+        self._db = None
+        # sqlite3 연결은 한 번에 한 스레드만 쓴다
+        self._db_lock = threading.Lock()
+        # 연결이 끊겨 기다릴 수 없는 곳에서 시작한 저장 작업
+        self._pending_saves = set()
+        if db_path:
+            self._db = sqlite3.connect(db_path, timeout=METADATA_BUSY_TIMEOUT, check_same_thread=False)
+            # WAL: 한 워커가 쓰는 동안에도 다른 워커가 읽을 수 있다
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "session_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    @property
+    def persistent(self) -> bool:
+        return self._db is not None
+
+    @property
+    def memory_bytes(self) -> int:
+        return self._memory_bytes
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def checkpointer(self):
+        """The checkpointer shared by every session (must be first called inside the event loop)."""
+        if self._checkpointer is None:
+            if self.persistent:
+                # Optional dependency: langgraph-checkpoint-sqlite
+                import aiosqlite
+                from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+                self._checkpointer = AsyncSqliteSaver(aiosqlite.connect(self.db_path, timeout=DB_BUSY_TIMEOUT),
+                                                     serde=checkpoint_serde())
+            else:
+                self._checkpointer = MemorySaver(serde=checkpoint_serde())
+        return self._checkpointer
+
+    async def create(self, session_id: str, **data) -> dict:
+        session = {**data, "turn_count": data.get("turn_count", 0)}
+        self._touch(session_id, session)
+        await self._run(self._write, session_id, self._serialize(session))
+        self.evict()
+        return session
+
+    async def get(self, session_id: str):
+        self.evict()
+        # 다른 워커가 토론을 진행했을 수 있으므로 디스크의 메타데이터가 기준이다
+        stored = await self._run(self._read, session_id)
+        session = self._sessions.get(session_id)
+        if session is None:
+            if stored is None:
+                return None
+            session = stored
+            logger.info("Session %s: resumed from disk.", session_id)
+        elif stored is not None:
+            session.update(stored)
+        self._touch(session_id, session)
+        return session
+
+    async def save(self, session_id: str):
+        session = self._sessions.get(session_id)
+        if session is not None:
+            await self._run(self._write, session_id, self._serialize(session))
+
+    def save_soon(self, session_id: str):
+        """Save the session in the background (for code that is being cancelled and can't await)."""
+        if not self.persistent:
+            return
+        task = asyncio.ensure_future(self.save(session_id))
+        self._pending_saves.add(task)
+        task.add_done_callback(self._saved)
+
+    def _saved(self, task):
+        self._pending_saves.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Could not save session: %r", task.exception())
+
+    async def advance_turn(self, session_id: str) -> int:
+        """Count a finished turn, save the session and return the new ``turn_count``."""
+        session = self._sessions.get(session_id)
+        if session is None:
+            return 0
+        if not self.persistent:
+            session["turn_count"] += 1
+            return session["turn_count"]
+        session["turn_count"] = await self._run(self._increment, session_id, self._serialize(session))
+        return session["turn_count"]
+
+    def account(self, session_id: str, new_bytes: int):
+        """Record a new utterance in the session's memory estimate.
+
+        Every in-memory checkpoint holds its own copy of the history channel,
+        so each step adds the current history size, not just the new bytes.
+        """
+        session = self._sessions.get(session_id)
+        if session is None or self.persistent:
+            return
+        session["history_bytes"] = session.get("history_bytes", 0) + new_bytes
+        session["memory_bytes"] = session.get("memory_bytes", 0) + session["history_bytes"]
+        self._memory_bytes += session["history_bytes"]
+        self.evict()
+
+    def evict(self):
+        """Drop expired sessions, then least recently used ones while over a limit."""
+        now = time.monotonic()
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            expired = now - session["last_access"] > self.ttl_seconds
+            over = len(self._sessions) > self.max_sessions or self._memory_bytes > self.memory_budget_bytes
+            # 방금 사용한 세션 하나만 남았다면 예산을 넘겨도 유지
+            if not expired and (not over or len(self._sessions) == 1):
+                break
+            self._evict(session_id, "expired" if expired else "over capacity")
+
+    def _touch(self, session_id, session):
+        session["last_access"] = time.monotonic()
+        self._sessions[session_id] = session
+        self._sessions.move_to_end(session_id)
+
+    def _evict(self, session_id, reason):
+        session = self._sessions.pop(session_id)
+        self._memory_bytes -= session.get("memory_bytes", 0)
+        if self.persistent:
+            logger.info("Session %s: paged out (%s).", session_id, reason)
+            return
+        logger.info("Session %s: evicted (%s).", session_id, reason)
+        if self._checkpointer is not None:
+            self._checkpointer.delete_thread(session_id)
+
+    async def _run(self, query, *args):
+        # 메모리 모드에는 DB가 없다
+        if not self.persistent:
+            return None
+        return await asyncio.to_thread(self._locked, query, *args)
+
+    def _locked(self, query, *args):
+        with self._db_lock:
+            return query(*args)
+
+    def _write(self, session_id, data):
+        # turn_count는 advance_turn만 바꾼다 (이 워커의 오래된 값으로 덮어쓰지 않는다)
+        with self._db:
+            self._db.execute(
+                "INSERT INTO sessions (session_id, data, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET "
+                "data = json_set(excluded.data, '$.turn_count', json_extract(sessions.data, '$.turn_count')), "
+                "updated_at = excluded.updated_at",
+                (session_id, data, time.time())
+            )
+
+    def _increment(self, session_id, data):
+        # 읽고 더해서 다시 쓰면 다른 워커의 증가분을 덮어쓸 수 있으므로 DB 안에서 증가시킨다
+        with self._db:
+            self._db.execute(
+                "UPDATE sessions SET data = json_set(?, '$.turn_count', json_extract(data, '$.turn_count') + 1), "
+                "updated_at = ? WHERE session_id = ?",
+                (data, time.time(), session_id)
+            )
+            row = self._db.execute(
+                "SELECT json_extract(data, '$.turn_count') FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return row[0]
+
+    def _serialize(self, session):
+        return json.dumps({k: session.get(k) for k in PERSISTED_FIELDS})
+
+    def _read(self, session_id):
+        row = self._db.execute("SELECT data FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return json.loads(row[0]) if row else None
@@ -0,0 +1,128 @@
+import asyncio
+import json
+import os
+import time
+
+# 토큰 묶음 전송 기본값 (세션별로 /start_debate에서 덮어쓸 수 있음)
+DEFAULT_FLUSH_INTERVAL_MS = int(os.environ.get("DEBATE_FLUSH_INTERVAL_MS", 30))
+DEFAULT_FLUSH_BYTES = int(os.environ.get("DEBATE_FLUSH_BYTES", 256))
+
+_DONE = object()
+
+
+def sse_event(payload: dict) -> str:
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+class TokenCoalescer:
+    """Buffers streamed tokens per role and emits them as fewer, larger SSE frames.
+
+    A buffer is flushed when it reaches ``flush_bytes``, when ``flush_interval``
+    seconds have passed since its first token, or when the speaker or the
+    frame type (answer "token" vs. "reasoning") changes.
+    ``flush_interval <= 0`` disables coalescing.
+    """
+
+    def __init__(self, flush_interval: float = DEFAULT_FLUSH_INTERVAL_MS / 1000,
+                 flush_bytes: int = DEFAULT_FLUSH_BYTES):
+        self.flush_interval = flush_interval
+        self.flush_bytes = flush_bytes
+        self._role = None
+        self._type = "token"
+        self._parts = []
+        self._size = 0
+        self._deadline = None
+
+    def add(self, role: str, content: str, frame_type: str = "token") -> str:
+        """Buffer a token; returns the frames that are due now ('' if none)."""
+        frames = ""
+        if role != self._role or frame_type != self._type:
+            frames = self.flush()
+            self._role = role
+            self._type = frame_type
+        if not self._parts:
+            self._deadline = time.monotonic() + self.flush_interval
+        self._parts.append(content)
+        self._size += len(content.encode())
+        if self._size >= self.flush_bytes or self.flush_interval <= 0:
+            frames += self.flush()
+        return frames
+
+    def flush(self) -> str:
+        if not self._parts:
+            return ""
+        content = "".join(self._parts)
+        self._parts = []
+        self._size = 0
+        self._deadline = None
+        return sse_event({"type": self._type, "role": self._role, "content": content})
+
+    def time_to_flush(self):
+        """Seconds until the pending buffer is due, or None when nothing is buffered."""
+        if self._deadline is None:
+            return None
+        return max(0.0, self._deadline - time.monotonic())
+
+
+async def watch_disconnect(request, disconnected: asyncio.Event):
+    """Set ``disconnected`` once the client behind ``request`` goes away."""
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+    disconnected.set()
+
+
+async def iterate_with_ticks(aiterable, timeout_fn, stop: asyncio.Event = None):
+    """Yield items from ``aiterable``; yield None whenever ``timeout_fn()`` seconds pass without one.
+
+    The source is consumed by a single pump task so that its context
+    (LangChain callbacks live in contextvars) never hops between tasks.
+    Iteration ends early when ``stop`` is set; the pump, and with it the
+    source, is cancelled and closed before this generator finishes.
+    """
+    queue = asyncio.Queue(maxsize=256)
+
+    async def pump():
+        try:
+            async for item in aiterable:
+                await queue.put((item, None))
+            await queue.put((_DONE, None))
+        except Exception as e:
+            await queue.put((_DONE, e))
+
+    task = asyncio.create_task(pump())
+    stopped = asyncio.ensure_future(stop.wait()) if stop is not None else None
+    getter = None
+    try:
+        while True:
+            if stop is not None and stop.is_set():
+                return
+            if queue.empty():
+                getter = asyncio.ensure_future(queue.get())
+                waiting = {getter, stopped} if stopped is not None else {getter}
+                await asyncio.wait(waiting, timeout=timeout_fn(), return_when=asyncio.FIRST_COMPLETED)
+                if not getter.done():
+                    getter.cancel()
+                    if stop is None or not stop.is_set():
+                        yield None
+                    continue
+                item, error = getter.result()
+            else:
+                item, error = queue.get_nowait()
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        for waiter in (getter, stopped):
+            if waiter is not None:
+                waiter.cancel()
+        task.cancel()
+        # 소스(그래프 실행과 LLM 요청)가 실제로 멈출 때까지 기다린다
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        aclose = getattr(aiterable, "aclose", None)
+        if aclose is not None:
+            await aclose()
@@ -0,0 +1,74 @@
+"""Import-time profile of the server and CLI entry points (``--profile-startup``).
+
+Every process start (server workers, batch shards) pays for importing its
+modules before it does any work. ``profile_startup`` imports an entry
+module in a fresh interpreter with ``python -X importtime``, adds up the
+time, lists the heaviest top-level packages and compares the total with
+``DEBATE_IMPORT_BUDGET_MS``. Provider SDKs are imported lazily (see
+``llm_registry.PROVIDER_LOADERS``), so they are measured separately: what
+loading each provider adds on top of the entry module.
+"""
+import os
+import subprocess
+import sys
+
+# 진입 모듈 import에 허용하는 시간 (밀리초; 프로바이더 SDK는 제외)
+IMPORT_BUDGET_MS = float(os.environ.get("DEBATE_IMPORT_BUDGET_MS", 2000))
+# 보고서에 보여 줄 무거운 패키지 수
+TOP_PACKAGES = 10
+
+
+def measure_imports(code: str):
+    """Run ``code`` in a fresh interpreter and return [(module, self_ms)] for every import."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Import failed: {result.stderr.strip().splitlines()[-1:]}")
+    imports = []
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package" (하위 import는 들여쓰기됨)
+        if not line.startswith("import time:"):
+            continue
+        own, _, name = line[len("import time:"):].split("|")
+        if own.strip().isdigit():
+            imports.append((name.strip(), int(own) / 1000))
+    return imports
+
+
+def total_ms(imports) -> float:
+    return sum(ms for _, ms in imports)
+
+
+def by_package(imports):
+    """Self time summed per top-level package, heaviest first."""
+    packages = {}
+    for name, ms in imports:
+        root = name.split(".")[0]
+        packages[root] = packages.get(root, 0.0) + ms
+    return sorted(packages.items(), key=lambda item: item[1], reverse=True)
+
+
+def profile_startup(module: str, providers=("ollama", "google"), budget_ms: float = IMPORT_BUDGET_MS) -> bool:
+    """Print the import-time report of ``module``; False when it is over budget."""
+    imports = measure_imports(f"import {module}")
+    total = total_ms(imports)
+    print(f"Importing {module}: {total:.0f} ms (budget {budget_ms:.0f} ms)")
+    for name, ms in by_package(imports)[:TOP_PACKAGES]:
+        print(f"  {ms:8.1f} ms  {name}")
+
+    # 프로바이더는 첫 사용 때 불러오므로 진입 모듈에 더해지는 시간만 센다
+    for provider in providers:
+        try:
+            loaded = measure_imports(f"import {module}, llm_registry; llm_registry.load_provider({provider!r})")
+        except RuntimeError as e:
+            print(f"Provider {provider}: not available ({e})")
+            continue
+        extra = total_ms(loaded) - total
+        print(f"Provider {provider}: +{extra:.0f} ms on first use")
+
+    within = total <= budget_ms
+    if not within:
+        print(f"Over the import budget by {total - budget_ms:.0f} ms")
+    return within
@@ -251,6 +251,10 @@ document.addEventListener('DOMContentLoaded', () => {
     let isWaitingForNext = false;
     let eventQueue = [];
     let isProcessingQueue = false;
+    // Auto play keeps one /stream_debate connection open for the whole debate
+    let isPersistentStream = false;
+    // Pending retry after the server answered "busy"
+    let busyRetryTimer = null;
 
     // Streaming state
     let currentRole = null;
@@ -295,6 +299,11 @@ document.addEventListener('DOMContentLoaded', () => {
                 })
             });
 
+            if (response.status === 503) {
+                // Every slot and queue place for this model is taken
+                const retryAfter = response.headers.get('Retry-After') || 10;
+                throw new Error(`서버가 혼잡합니다. ${retryAfter}초 후 다시 시도해 주세요.`);
+            }
             if (!response.ok) throw new Error('Failed to start debate');
             const data = await response.json();
             currentSessionId = data.session_id;
@@ -325,8 +334,10 @@ document.addEventListener('DOMContentLoaded', () => {
         nextBtn.disabled = true;
         floatingNextBtn.disabled = true;
 
-        // Connect to SSE endpoint for next turn
-        const url = `/next_turn?session_id=${currentSessionId}`;
+        // Auto play: one stream runs the debate on the server; manual: one utterance per request
+        isPersistentStream = isAutoPlay;
+        const endpoint = isPersistentStream ? 'stream_debate' : 'next_turn';
+        const url = `/${endpoint}?session_id=${currentSessionId}`;
         console.log("Connecting to SSE:", url);
         eventSource = new EventSource(url);
 
@@ -379,10 +390,52 @@ document.addEventListener('DOMContentLoaded', () => {
                 if (data.type === 'token') {
                     hideThinking();
                     handleToken(data.role, data.content);
+                } else if (data.type === 'reasoning') {
+                    hideThinking();
+                    handleReasoning(data.role, data.content);
+                } else if (data.type === 'reset') {
+                    // Tokens sent so far were the model's reasoning, not its answer
+                    resetMessage(data.role);
+                } else if (data.type === 'waiting') {
+                    // Queued behind other debates on the same model (position 0: our turn has come)
+                    showThinking();
+                    thinkingDiv.querySelector('.thinking-dots').textContent =
+                        data.position > 0 ? `대기 중 (${data.position}번째)` : 'Thinking';
+                } else if (data.type === 'busy') {
+                    // The server shed this turn; the stream_end that follows must not start another one
+                    if (eventSource) {
+                        eventSource.close();
+                        eventSource = null;
+                    }
+                    eventQueue = eventQueue.filter(e => e.type !== 'stream_end');
+                    handleBusy(data.retry_after);
+                } else if (data.type === 'regenerate') {
+                    // The previous turn was cut off (connection lost) and is generated again
+                    addSystemMessage("중단된 발언을 다시 생성합니다.");
+                } else if (data.type === 'decision') {
+                    // Provisional moderator decision; the final one arrives with turn_end / end
+                    console.log('Moderator decision:', data.decision);
                 } else if (data.type === 'turn_end') {
                     // Turn ended logic handled at stream_end usually, 
                     // but we can use this to know a role finished.
                     console.log('Turn end for role:', data.role);
+                    if (isPersistentStream && !isAutoPlay) {
+                        // Auto play was switched off: stop the running stream after this utterance
+                        // (the server regenerates anything it had started on the next request)
+                        if (eventSource) {
+                            eventSource.close();
+                            eventSource = null;
+                        }
+                        isPersistentStream = false;
+                        eventQueue = eventQueue.filter(e => e.type === 'end');
+                        if (eventQueue.length === 0) {
+                            isWaitingForNext = true;
+                            nextBtn.disabled = false;
+                            floatingNextBtn.disabled = false;
+                        }
+                    } else if (isPersistentStream) {
+                        showThinking();
+                    }
                 } else if (data.type === 'stream_end') {
                     // The stream for this turn is done.
                     if (eventSource) {
@@ -475,7 +528,7 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     });
 
-    function handleToken(role, content) {
+    function ensureMessageDiv(role) {
         if (role !== currentRole) {
             // New speaker, create new message box
             currentRole = role;
@@ -483,6 +536,28 @@ document.addEventListener('DOMContentLoaded', () => {
             currentMessageDiv = createMessageDiv(role);
             chatContainer.appendChild(currentMessageDiv);
         }
+    }
+
+    function handleReasoning(role, content) {
+        ensureMessageDiv(role);
+        let reasoningDiv = currentMessageDiv.querySelector('.message-reasoning');
+        if (!reasoningDiv) {
+            reasoningDiv = document.createElement('div');
+            reasoningDiv.className = 'message-reasoning';
+            currentMessageDiv.insertBefore(reasoningDiv, currentMessageDiv.querySelector('.message-content'));
+        }
+        reasoningDiv.textContent += content;
+        chatContainer.scrollTop = chatContainer.scrollHeight;
+    }
+
+    function resetMessage(role) {
+        if (role !== currentRole || !currentMessageDiv) return;
+        currentContentBuffer = "";
+        currentMessageDiv.querySelector('.message-content').innerHTML = "";
+    }
+
+    function handleToken(role, content) {
+        ensureMessageDiv(role);
 
         // Append token to buffer and update display
         currentContentBuffer += content;
@@ -532,11 +607,24 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
+    function handleBusy(retryAfter) {
+        hideThinking();
+        addSystemMessage(`서버가 혼잡합니다. ${retryAfter}초 후 다시 시도합니다.`);
+        const sessionId = currentSessionId;
+        clearTimeout(busyRetryTimer);
+        busyRetryTimer = setTimeout(() => {
+            busyRetryTimer = null;
+            if (currentSessionId && currentSessionId === sessionId) streamTurn();
+        }, retryAfter * 1000);
+    }
+
     function stopDebate() {
         if (eventSource) {
             eventSource.close();
             eventSource = null;
         }
+        clearTimeout(busyRetryTimer);
+        busyRetryTimer = null;
         setLoading(false);
         stopBtn.classList.add('hidden');
         hideThinking();
@@ -0,0 +1,184 @@
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+DECISION_MARK = "Decision:"
+
+# 조각 종류
+THINK = "think"
+VISIBLE = "visible"
+DECISION = "decision"
+# 여는 태그 없이 추론을 쓰는 모델: 지금까지 visible로 보낸 내용이 사실 추론이었다
+RESET = "reset"
+
+DECISIONS = ("stop", "instruction", "continue")
+# Decision 앞에 붙곤 하는 마크다운 꾸밈 문자
+DECISION_MARKUP = "*_#"
+
+
+def _held_suffix(text: str, markers) -> int:
+    """Length of the longest suffix of ``text`` that could be the start of a marker."""
+    longest = 0
+    for marker in markers:
+        for size in range(min(len(marker) - 1, len(text)), longest, -1):
+            if marker.startswith(text[-size:]):
+                longest = size
+                break
+    return longest
+
+
+class ResponseParser:
+    """Incremental classifier for a streamed LLM response.
+
+    ``feed`` takes raw chunks and returns ``(kind, text)`` segments as soon
+    as they are certain: reasoning inside ``<think>...</think>`` (THINK),
+    the answer (VISIBLE) and, with ``parse_decision``, the moderator's
+    ``Decision:`` value (DECISION) the moment it can be read. Only a
+    possible partial marker at the end of a chunk is held back.
+    """
+
+    def __init__(self, parse_decision: bool = False):
+        self.parse_decision = parse_decision
+        self.decision = None
+        self._state = "start"
+        self._pending = ""
+        self._raw = []
+        self._think = []
+        self._visible = []
+        self._decision_text = []
+        # 상태 -> 처리 함수 (더 진행할 수 있으면 True)
+        self._steps = {
+            "start": self._start,
+            "think": self._think_state,
+            "visible": self._visible_state,
+            "decision": self._decision_state
+        }
+
+    @property
+    def content(self) -> str:
+        """The visible answer (reasoning and the Decision line removed)."""
+        return "".join(self._visible).strip()
+
+    @property
+    def reasoning(self) -> str:
+        return "".join(self._think).strip()
+
+    @property
+    def text(self) -> str:
+        """The response exactly as streamed."""
+        return "".join(self._raw)
+
+    def feed(self, text: str):
+        segments = []
+        self._raw.append(text)
+        self._pending += text
+        while self._pending:
+            if not self._steps[self._state](segments):
+                break
+        return segments
+
+    def close(self):
+        """Flush whatever was held back at the end of the stream."""
+        segments = []
+        rest, self._pending = self._pending, ""
+        if self._state == "think":
+            self._emit(segments, THINK, rest)
+        elif self._state == "decision":
+            self._decision_text.append(rest)
+            self._decide(segments, final=True)
+        elif rest.strip() or self._state == "visible":
+            self._emit(segments, VISIBLE, rest)
+        return segments
+
+    def _emit(self, segments, kind, text):
+        if not text:
+            return
+        if kind == VISIBLE:
+            if not self._visible:
+                # 답변 앞의 공백은 보내지 않는다
+                text = text.lstrip()
+                if not text:
+                    return
+            self._visible.append(text)
+        elif kind == THINK:
+            self._think.append(text)
+        segments.append((kind, text))
+
+    def _start(self, segments):
+        stripped = self._pending.lstrip()
+        if stripped.startswith(THINK_OPEN):
+            self._pending = stripped[len(THINK_OPEN):]
+            self._state = "think"
+            return True
+        if THINK_OPEN.startswith(stripped):
+            # 아직 여는 태그인지 알 수 없다
+            return False
+        self._state = "visible"
+        return True
+
+    def _think_state(self, segments):
+        end = self._pending.find(THINK_CLOSE)
+        if end >= 0:
+            self._emit(segments, THINK, self._pending[:end])
+            self._pending = self._pending[end + len(THINK_CLOSE):]
+            self._state = "visible"
+            return True
+        held = _held_suffix(self._pending, (THINK_CLOSE,))
+        self._emit(segments, THINK, self._pending[:len(self._pending) - held])
+        self._pending = self._pending[len(self._pending) - held:]
+        return False
+
+    def _visible_state(self, segments):
+        markers = (THINK_CLOSE, DECISION_MARK) if self.parse_decision else (THINK_CLOSE,)
+        end = self._pending.find(THINK_CLOSE)
+        mark = self._pending.find(DECISION_MARK) if self.parse_decision and self.decision is None else -1
+        if end >= 0 and (mark < 0 or end < mark):
+            # 여는 태그 없이 시작한 추론이 여기서 끝났다
+            self._think.extend(self._visible)
+            self._think.append(self._pending[:end])
+            self._visible = []
+            self._decision_text = []
+            self.decision = None
+            segments.append((RESET, ""))
+            self._pending = self._pending[end + len(THINK_CLOSE):]
+            return True
+        if mark >= 0:
+            # "**Decision:**"처럼 꾸밈 문자만 앞에 붙은 경우 그 문자는 버린다
+            self._emit(segments, VISIBLE, self._pending[:mark].rstrip(DECISION_MARKUP))
+            self._pending = self._pending[mark + len(DECISION_MARK):]
+            self._state = "decision"
+            return True
+        held = _held_suffix(self._pending, markers)
+        if self.parse_decision and self.decision is None:
+            # 부분 표시 앞의 꾸밈 문자도 Decision 줄의 일부일 수 있다
+            head = self._pending[:len(self._pending) - held]
+            held += len(head) - len(head.rstrip(DECISION_MARKUP))
+        self._emit(segments, VISIBLE, self._pending[:len(self._pending) - held])
+        self._pending = self._pending[len(self._pending) - held:]
+        return False
+
+    def _decision_state(self, segments):
+        line_end = self._pending.find("\n")
+        if line_end < 0:
+            self._decision_text.append(self._pending)
+            self._pending = ""
+            self._decide(segments)
+            return False
+        self._decision_text.append(self._pending[:line_end])
+        self._pending = self._pending[line_end + 1:]
+        self._decide(segments, final=True)
+        # Decision 줄 뒤에 이어지는 내용은 다시 답변으로 본다
+        self._state = "visible"
+        return True
+
+    def _decide(self, segments, final=False):
+        if self.decision is not None:
+            return
+        text = "".join(self._decision_text).lower()
+        for decision in DECISIONS:
+            if decision in text:
+                self.decision = decision
+                break
+        else:
+            if not final:
+                return
+            self.decision = "continue"
+        segments.append((DECISION, self.decision))
@@ -0,0 +1,95 @@
+from stream_parser import DECISION, RESET, THINK, VISIBLE, ResponseParser
+
+RESPONSE = "<think>찬성 측 논거를 먼저 정리한다</think>양측 모두 근거를 보강하세요.\n**Decision:** instruction\n"
+
+
+def run(chunks, parse_decision=True):
+    parser = ResponseParser(parse_decision=parse_decision)
+    segments = []
+    for chunk in chunks:
+        segments += parser.feed(chunk)
+    segments += parser.close()
+    return parser, segments
+
+
+def joined(segments, kind):
+    return "".join(text for k, text in segments if k == kind)
+
+
+def test_think_tags_split_across_chunks():
+    parser, segments = run(["<thi", "nk>추론", "입니다</th", "ink>답변", "입니다"], parse_decision=False)
+    assert parser.reasoning == "추론입니다"
+    assert parser.content == "답변입니다"
+    assert joined(segments, THINK) == "추론입니다"
+    assert joined(segments, VISIBLE) == "답변입니다"
+    assert parser.decision is None
+
+
+def test_decision_mark_split_across_chunks():
+    parser, segments = run(["토론을 마칩니다. Deci", "sion: st", "op\n"])
+    assert parser.content == "토론을 마칩니다."
+    assert parser.decision == "stop"
+    assert [text for kind, text in segments if kind == DECISION] == ["stop"]
+    assert "Deci" not in joined(segments, VISIBLE)
+
+
+def test_decision_is_sent_before_the_line_ends():
+    parser = ResponseParser(parse_decision=True)
+    parser.feed("정리하세요.\nDecision: ")
+    assert parser.decision is None
+    assert (DECISION, "continue") in parser.feed("continue")
+    assert parser.close() == []
+
+
+def test_markdown_before_split_decision_mark_is_dropped():
+    parser, segments = run(["양측 발언을 들었습니다. **Dec", "ision:*", "* instruction"])
+    assert parser.content == "양측 발언을 들었습니다."
+    assert parser.decision == "instruction"
+    assert "*" not in joined(segments, VISIBLE)
+
+
+def test_no_decision_line():
+    parser, segments = run(["Decimal 표기는 ", "나라마다 다릅니다. Deci", "ding factors"])
+    assert parser.decision is None
+    assert parser.content == "Decimal 표기는 나라마다 다릅니다. Deciding factors"
+    assert joined(segments, VISIBLE) == parser.content
+    assert not any(kind == DECISION for kind, _ in segments)
+
+
+def test_partial_mark_held_at_the_end_is_flushed_on_close():
+    parser, segments = run(["결론은 없습니다 **Deci"])
+    assert parser.decision is None
+    assert joined(segments, VISIBLE) == "결론은 없습니다 **Deci"
+
+
+def test_unreadable_decision_defaults_to_continue():
+    parser, segments = run(["다음 발언을 들어봅시다.\nDecision: ", "???"])
+    assert parser.decision == "continue"
+    assert (DECISION, "continue") in segments
+
+
+def test_reasoning_without_open_tag_is_reset():
+    parser, segments = run(["먼저 생각해 보면", "...</thi", "nk>최종 답변"], parse_decision=False)
+    assert (RESET, "") in segments
+    assert parser.reasoning == "먼저 생각해 보면..."
+    assert parser.content == "최종 답변"
+
+
+def test_every_split_point_gives_the_same_result():
+    whole, whole_segments = run([RESPONSE])
+    assert whole.reasoning == "찬성 측 논거를 먼저 정리한다"
+    assert whole.content == "양측 모두 근거를 보강하세요."
+    assert whole.decision == "instruction"
+    for split in range(1, len(RESPONSE)):
+        parser, segments = run([RESPONSE[:split], RESPONSE[split:]])
+        assert (parser.reasoning, parser.content, parser.decision) == (whole.reasoning, whole.content, whole.decision), split
+        assert joined(segments, VISIBLE) == joined(whole_segments, VISIBLE), split
+        assert joined(segments, THINK) == joined(whole_segments, THINK), split
+        assert parser.text == RESPONSE
+
+
+def test_one_character_chunks():
+    parser, segments = run(list(RESPONSE))
+    assert parser.reasoning == "찬성 측 논거를 먼저 정리한다"
+    assert parser.content == "양측 모두 근거를 보강하세요."
+    assert [text for kind, text in segments if kind == DECISION] == ["instruction"]
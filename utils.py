@@ -0,0 +1,22 @@
+import asyncio
+import contextvars
+
+
+def match_model(table: dict, model_name: str, default):
+    """Look up a per-model setting in ``table`` by the longest prefix of ``model_name``."""
+    best = None
+    for prefix in table:
+        if model_name and model_name.startswith(prefix):
+            if best is None or len(prefix) > len(best):
+                best = prefix
+    return table[best] if best else default
+
+
+def spawn_detached(coro) -> asyncio.Task:
+    """Start ``coro`` as a task in an empty context.
+
+    Background LLM calls (summaries, pre-checks, warm-ups, cache requests)
+    must not inherit the running node's LangChain callbacks, or their
+    tokens would show up in that node's stream events.
+    """
+    return contextvars.Context().run(asyncio.ensure_future, coro)
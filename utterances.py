@@ -0,0 +1,56 @@
+import time
+from dataclasses import dataclass, field
+
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from history import estimate_tokens
+
+# 그래프 노드 -> 토론 기록에 표시되는 이름
+SPEAKER_NAMES = {
+    "moderator": "사회자",
+    "debater_A": "찬성",
+    "debater_B": "반대"
+}
+
+
+@dataclass(slots=True, frozen=True)
+class Utterance:
+    """One entry of the debate history.
+
+    ``role`` is the graph node that spoke. The text is kept without the
+    speaker prefix; ``render`` adds it back where a prompt needs a plain
+    string. ``tokens`` is estimated once, when the utterance is created.
+    """
+
+    role: str
+    text: str
+    tokens: int = 0
+    created_at: float = field(default_factory=time.time)
+
+    @classmethod
+    def create(cls, role: str, text: str) -> "Utterance":
+        # 토큰 수는 프롬프트에 들어가는 형태(이름 포함)로 한 번만 센다
+        return cls(role, text, estimate_tokens(_speaker(role) + ": " + text))
+
+    def render(self) -> str:
+        return f"{_speaker(self.role)}: {self.text}"
+
+
+def _speaker(role: str) -> str:
+    return SPEAKER_NAMES.get(role, role)
+
+
+def merge_offsets(left: dict, right: dict) -> dict:
+    """State reducer for ``last_index``: later offsets win."""
+    return {**(left or {}), **(right or {})}
+
+
+def last_by(state, role: str):
+    """The latest utterance by ``role`` (O(1) through ``last_index``), or None."""
+    index = (state.get("last_index") or {}).get(role)
+    return None if index is None else state["history"][index]
+
+
+def checkpoint_serde() -> JsonPlusSerializer:
+    """Checkpoint serializer that may restore ``Utterance`` records."""
+    return JsonPlusSerializer(allowed_msgpack_modules=[(__name__, Utterance.__name__)])